@@ -1,16 +1,18 @@
-from flask import Flask, render_template, request, abort
-from models import init_db, list_books, get_book, get_recommendations, get_top_rated, get_categories, get_recent_books
+from flask import Flask, render_template, request, abort, jsonify
+from cache import cache_stats, catalog_version
+from http_cache import PAGE_MAX_AGE, cached_page
+from metrics import init_metrics
+from model_service import init_model_service, model_stats
+from suggest import SUGGEST_LIMIT, index_stats, init_suggest, suggest
+from models import init_db, list_books, get_book, get_recommendations, get_top_rated, get_categories, get_recent_books, get_user_recommendations
 
-app = Flask(__name__)
-
-# Inicializo la base de datos
-init_db(app)
-
-@app.route('/')
+@cached_page()
 def home():
     """Página principal: libros más recientes"""
     page = request.args.get('page', 1, type=int)
-    result = get_recent_books(page=page, per_page=20)
+    after = request.args.get('after')
+    before = request.args.get('before')
+    result = get_recent_books(page=page, per_page=20, after=after, before=before)
     categories = get_categories()
     return render_template('home.html', 
                          books=result['books'], 
@@ -19,22 +21,26 @@ def home():
                          page_title="Libros recientes",
                          current_route='home')
 
-@app.route('/search')
+@cached_page(unless=lambda: bool(request.args.get('q')))
 def search():
     """Búsqueda de libros por título o autor"""
     q = request.args.get('q', '')
     category = request.args.get('category', '')
     page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')
+    before = request.args.get('before')
     
-    if category:
-        result = list_books(page=page, per_page=20)
-        result['books'] = [b for b in result['books'] if b.get('category') == category]
+    if q and category:
+        result = list_books(q=q, language=category, page=page, per_page=20, after=after, before=before)
+        page_title = f"Resultados para: {q} ({category})"
+    elif category:
+        result = list_books(language=category, page=page, per_page=20, after=after, before=before)
         page_title = f"Libros en {category}"
     elif q:
-        result = list_books(q=q, page=page, per_page=20)
+        result = list_books(q=q, page=page, per_page=20, after=after, before=before)
         page_title = f"Resultados para: {q}"
     else:
-        result = list_books(page=page, per_page=20)
+        result = list_books(page=page, per_page=20, after=after, before=before)
         page_title = "Todos los libros"
     
     categories = get_categories()
@@ -47,7 +53,6 @@ def search():
                          page_title=page_title,
                          current_route='search')
 
-@app.route('/book/<int:book_id>')
 def book_detail(book_id):
     """Detalle de un libro específico con recomendaciones"""
     book = get_book(book_id)
@@ -59,11 +64,13 @@ def book_detail(book_id):
     
     return render_template('detail.html', book=book, recommendations=recommendations)
 
-@app.route('/top-rated')
+@cached_page()
 def top_rated():
     """Página de libros más valorados"""
     page = request.args.get('page', 1, type=int)
-    result = get_top_rated(page=page, per_page=20)
+    after = request.args.get('after')
+    before = request.args.get('before')
+    result = get_top_rated(page=page, per_page=20, after=after, before=before)
     categories = get_categories()
     return render_template('home.html', 
                          books=result['books'], 
@@ -72,18 +79,72 @@ def top_rated():
                          page_title="Libros más valorados",
                          current_route='top_rated')
 
-@app.errorhandler(404)
+def user_recommendations(user_id):
+    """Libros recomendados a un usuario (precalculados a partir de sus valoraciones)"""
+    books = get_user_recommendations(user_id)
+    categories = get_categories()
+    return render_template('home.html',
+                         books=books,
+                         categories=categories,
+                         page_title=f"Recomendados para el usuario {user_id}",
+                         empty_message="Todavía no hay recomendaciones para este usuario.")
+
+def suggest_view():
+    """Autocompletado del buscador: libros cuyo título o autor empieza por q (sin consultar la BD)"""
+    q = request.args.get('q', '')
+    limit = request.args.get('limit', SUGGEST_LIMIT, type=int)
+    response = jsonify({'q': q, 'suggestions': suggest(q, limit=limit)})
+    response.headers['Cache-Control'] = f'public, max-age={PAGE_MAX_AGE}'
+    return response
+
+def cache_stats_view():
+    """Contadores de aciertos/fallos de las cachés del catálogo"""
+    return jsonify({'catalog_version': catalog_version(), 'caches': cache_stats(),
+                    'suggest_index': index_stats(), 'recommendation_model': model_stats()})
+
 def not_found(error):
     """Manejo simple de error 404"""
     return '<h1>404 - Libro no encontrado</h1><a href="/">Volver al inicio</a>', 404
 
+def create_app():
+    """
+    Creo la aplicación: configuración de la base de datos y rutas.
+    La usan tanto el servidor de desarrollo (python app.py) como wsgi.py (gunicorn).
+    """
+    app = Flask(__name__)
+    
+    # Inicializo la base de datos
+    init_db(app)
+    
+    app.add_url_rule('/', view_func=home)
+    app.add_url_rule('/search', view_func=search)
+    app.add_url_rule('/book/<int:book_id>', view_func=book_detail)
+    app.add_url_rule('/top-rated', view_func=top_rated)
+    app.add_url_rule('/user/<int:user_id>/recommendations', view_func=user_recommendations)
+    app.add_url_rule('/api/suggest', view_func=suggest_view)
+    app.add_url_rule('/cache/stats', view_func=cache_stats_view)
+    app.register_error_handler(404, not_found)
+    
+    # Tiempos por ruta y consulta, y GET /metrics (ver metrics.py)
+    init_metrics(app)
+    
+    # Índice de autocompletado en memoria (ver suggest.py)
+    init_suggest(app)
+    
+    # Modelo de recomendaciones en memoria, se carga con la primera ficha (ver model_service.py)
+    init_model_service()
+    
+    return app
+
 if __name__ == '__main__':
     import os
     
     # Leo el modo debug desde variable de entorno (por defecto False en producción)
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
-    print("Iniciando La Casa de la Cultura...")
+    app = create_app()
+    
+    print("Iniciando La Casa de la Cultura (servidor de desarrollo; en producción usa gunicorn, ver wsgi.py)...")
     print(f"Modo debug: {'activado' if debug_mode else 'desactivado'}")
     print("Accede a: http://127.0.0.1:5000")
     
@@ -0,0 +1,227 @@
+"""
+Caché en memoria para las lecturas del catálogo.
+
+El catálogo solo cambia cuando se ejecuta el ETL o se refrescan las vistas
+materializadas, así que guardo los resultados de las consultas de models.py
+en cachés LRU con caducidad (TTL) y tamaño acotado.
+
+La invalidación es explícita: refresh_views.sql y el ETL llaman a
+bump_catalog_version(), que hace NOTIFY catalog_changed. Cada proceso de la
+web escucha ese canal en un hilo y vacía sus cachés al recibirlo.
+"""
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# TTL por defecto: es solo una red de seguridad, la invalidación va por NOTIFY
+DEFAULT_TTL = float(os.getenv('CACHE_TTL', '600'))
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+
+# Canal de PostgreSQL por el que llegan los avisos de cambio de catálogo
+INVALIDATION_CHANNEL = 'catalog_changed'
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Caché LRU con caducidad por entrada y contadores de aciertos/fallos.
+    Es segura entre hilos (un lock protege el OrderedDict).
+    """
+
+    def __init__(self, name, maxsize=256, ttl=DEFAULT_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Devuelvo el valor guardado para key o default si no está o ha caducado"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Guardo un valor, expulsando el menos usado si la caché está llena"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+# Registro de todas las cachés para poder invalidarlas a la vez
+_caches = {}
+_registry_lock = threading.Lock()
+
+# Funciones que se llaman después de vaciar las cachés (ver on_invalidate)
+_invalidation_callbacks = []
+
+# Última versión del catálogo conocida por este proceso (ver bump_catalog_version)
+# y cuándo cambió (catalog_version.updated_at), para las cabeceras HTTP
+_catalog_version = 0
+_catalog_updated_at = None
+
+def get_cache(name, maxsize=256, ttl=DEFAULT_TTL):
+    """Devuelvo la caché con ese nombre, creándola si no existe"""
+    with _registry_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(name, maxsize=maxsize, ttl=ttl)
+        return _caches[name]
+
+def cached(name, maxsize=256, ttl=DEFAULT_TTL):
+    """
+    Decorador que guarda el resultado de la función según sus argumentos.
+    Si la función lanza una excepción no se guarda nada.
+    Los valores devueltos se comparten entre peticiones: no hay que modificarlos.
+    """
+    def decorator(fn):
+        cache = get_cache(name, maxsize=maxsize, ttl=ttl)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return fn(*args, **kwargs)
+            key = (args, tuple(sorted(kwargs.items())))
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = fn(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def invalidate_all(version=None, updated_at=None):
+    """Vacío todas las cachés (el catálogo ha cambiado)"""
+    global _catalog_version, _catalog_updated_at
+    with _registry_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+    if version is not None:
+        _catalog_version = version
+    if updated_at is not None:
+        _catalog_updated_at = updated_at
+    print(f"🔄 Cachés del catálogo invalidadas (versión {_catalog_version})", flush=True)
+    with _registry_lock:
+        callbacks = list(_invalidation_callbacks)
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error al recargar tras la invalidación ({getattr(callback, '__name__', callback)}): {e}", flush=True)
+
+def on_invalidate(callback):
+    """
+    Registro una función sin argumentos que se llama cada vez que cambia el
+    catálogo, después de vaciar las cachés. Se ejecuta en el hilo del
+    listener: sirve para reconstruir estructuras en memoria que no son una
+    caché LRU (por ejemplo el índice de suggest.py).
+    """
+    with _registry_lock:
+        _invalidation_callbacks.append(callback)
+
+def catalog_version():
+    """Versión del catálogo según el último aviso recibido"""
+    return _catalog_version
+
+def catalog_updated_at():
+    """Fecha del último cambio del catálogo (datetime con zona) o None si no se conoce"""
+    return _catalog_updated_at
+
+def cache_stats():
+    """Contadores de todas las cachés"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
+
+def _read_catalog_version(conn):
+    """Leo la versión actual y su fecha de la tabla catalog_version (migración 004)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version, updated_at FROM catalog_version")
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else (0, None)
+    except Exception:
+        return 0, None
+
+def _listen_forever(connect, channel, retry_seconds):
+    global _catalog_version, _catalog_updated_at
+    first_connection = True
+    while True:
+        try:
+            conn = connect()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {channel}")
+
+            if first_connection:
+                # Al arrancar solo leo la versión: no vacío lo que haya cargado warm_up
+                _catalog_version, _catalog_updated_at = _read_catalog_version(conn)
+                first_connection = False
+            else:
+                # Al reconectar puedo haberme perdido avisos: invalido por si acaso
+                invalidate_all(*_read_catalog_version(conn))
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    # Releo la fila en lugar de fiarme del payload: así tengo también la fecha
+                    invalidate_all(*_read_catalog_version(conn))
+        except Exception as e:
+            print(f"Error en el listener de invalidación de caché: {e}", flush=True)
+            time.sleep(retry_seconds)
+
+def start_invalidation_listener(engine, channel=INVALIDATION_CHANNEL, retry_seconds=5):
+    """
+    Arranco un hilo que escucha NOTIFY en PostgreSQL y vacía las cachés.
+    Uso una conexión propia (fuera del pool) con los mismos datos que el engine.
+    """
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+
+    def connect():
+        return engine.dialect.dbapi.connect(*cargs, **cparams)
+
+    thread = threading.Thread(
+        target=_listen_forever,
+        args=(connect, channel, retry_seconds),
+        name='cache-invalidation-listener',
+        daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+"""
+Configuración de gunicorn (ver wsgi.py). Todo se puede cambiar por entorno:
+
+- WEB_CONCURRENCY: procesos (por defecto 2 x núcleos + 1, sin pasar de DB_CONNECTION_BUDGET)
+- DB_CONNECTION_BUDGET: conexiones a PostgreSQL que puede abrir la web entera (por defecto 80)
+- WEB_THREADS: hilos por proceso (por defecto 4)
+- WEB_TIMEOUT: segundos antes de reiniciar un proceso bloqueado (por defecto 30)
+- PORT: puerto (por defecto 5000)
+
+Cada hilo necesita una conexión a la vez: WEB_THREADS no debería superar
+DB_POOL_SIZE + DB_MAX_OVERFLOW (ver models.engine_options), y
+WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW + 1) debe caber en el
+max_connections de PostgreSQL (100 por defecto; el +1 es la conexión LISTEN).
+Sin WEB_CONCURRENCY limito los procesos para no pasar de DB_CONNECTION_BUDGET
+(el presupuesto deja sitio al ETL y a psql); si se fija a mano y no cabe, aviso.
+"""
+import multiprocessing
+import os
+
+# Conexiones que abre como mucho cada proceso: su pool y la del LISTEN de cache.py
+connections_per_worker = (int(os.getenv('DB_POOL_SIZE', '5'))
+                          + int(os.getenv('DB_MAX_OVERFLOW', '5')) + 1)
+connection_budget = int(os.getenv('DB_CONNECTION_BUDGET', '80'))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+if os.getenv('WEB_CONCURRENCY'):
+    workers = int(os.getenv('WEB_CONCURRENCY'))
+else:
+    workers = max(1, min(multiprocessing.cpu_count() * 2 + 1, connection_budget // connections_per_worker))
+if workers * connections_per_worker > connection_budget:
+    print(f"⚠️ {workers} procesos x {connections_per_worker} conexiones = "
+          f"{workers * connections_per_worker}, más que DB_CONNECTION_BUDGET ({connection_budget}): "
+          f"PostgreSQL puede rechazar conexiones", flush=True)
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '4'))
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+# Reinicio los procesos de vez en cuando para acotar el crecimiento de memoria
+max_requests = 5000
+max_requests_jitter = 500
+
+# Sin preload: cada proceso abre sus conexiones y su hilo LISTEN después del fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+def post_worker_init(worker):
+    """Caliento el proceso (pool y cachés) antes de que empiece a aceptar peticiones"""
+    from models import warm_up
+    warm_up(worker.wsgi)
@@ -0,0 +1,85 @@
+"""
+Caché HTTP de las páginas de listado (/, /top-rated, /search sin texto).
+
+Estas páginas solo cambian cuando cambia el catálogo (ETL, refresco de vistas),
+que siempre llama a bump_catalog_version(). Por eso:
+
+- Guardo el HTML ya renderizado en una caché LRU (cache.TTLCache), con la
+  versión del catálogo en la clave. Se vacía con el resto de cachés al llegar
+  el NOTIFY, así que una página repetida no toca PostgreSQL ni Jinja.
+- Respondo con ETag (versión + hash del HTML), Last-Modified (fecha de la
+  versión) y Cache-Control, y devuelvo 304 si el navegador ya tiene la página.
+
+Si alguna consulta de la petición ha fallado (models._query_failed marca
+g.query_failed), la página sale vacía o incompleta con un 200: no la guardo
+ni la mando con validadores, sino con Cache-Control: no-store.
+"""
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from cache import CACHE_ENABLED, catalog_updated_at, catalog_version, get_cache
+
+# Páginas guardadas como máximo (una página de listado ocupa unos 15-40 KB)
+PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', '256'))
+
+# Segundos que el navegador o un proxy pueden reutilizar la página sin preguntar
+PAGE_MAX_AGE = int(os.getenv('PAGE_MAX_AGE', '60'))
+
+_pages = get_cache('rendered_pages', maxsize=PAGE_CACHE_SIZE)
+
+def _page_key(version):
+    """Ruta, parámetros (ordenados) y versión del catálogo"""
+    return request.path, tuple(sorted(request.args.items(multi=True))), version
+
+def _render(view, args, kwargs, version):
+    """
+    Ejecuto la vista y devuelvo (html, content-type, etag) o None si no es un
+    200 completo (con no-store si ha fallado alguna consulta)
+    """
+    response = make_response(view(*args, **kwargs))
+    if g.get('query_failed'):
+        response.cache_control.no_store = True
+        return None, response
+    if response.status_code != 200:
+        return None, response
+    body = response.get_data()
+    etag = f"{version}-{hashlib.sha1(body).hexdigest()[:16]}"
+    return (body, response.headers.get('Content-Type'), etag), response
+
+def cached_page(unless=None):
+    """
+    Decorador para vistas de listado: caché del HTML renderizado y GET condicional.
+    unless: función sin argumentos; si devuelve True la petición no se cachea
+    (por ejemplo, búsquedas con texto libre, que casi nunca se repiten).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless():
+                return view(*args, **kwargs)
+
+            version = catalog_version()
+            key = _page_key(version)
+            entry = _pages.get(key) if CACHE_ENABLED else None
+            if entry is None:
+                entry, response = _render(view, args, kwargs, version)
+                if entry is None:
+                    return response
+                if CACHE_ENABLED:
+                    _pages.set(key, entry)
+
+            body, content_type, etag = entry
+            response = current_app.response_class(body, content_type=content_type)
+            response.set_etag(etag)
+            updated_at = catalog_updated_at()
+            if updated_at is not None:
+                response.last_modified = updated_at
+            response.cache_control.public = True
+            response.cache_control.max_age = PAGE_MAX_AGE
+            # 304 sin cuerpo si coincide If-None-Match (o If-Modified-Since)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
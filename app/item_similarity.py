@@ -0,0 +1,118 @@
+"""
+Filtrado colaborativo libro-libro: los K libros más parecidos a cada libro.
+
+Dos libros se parecen si les gustan (rating >= 4) a los mismos usuarios:
+- 'cosine':  comunes / sqrt(lectores_a * lectores_b)
+- 'jaccard': comunes / (lectores_a + lectores_b - comunes)
+
+A diferencia de las reglas de asociación no hay soporte mínimo, así que da
+vecinos a cualquier libro con al menos un lector en común con otro.
+
+La matriz de similitud completa (10k x 10k) nunca se construye: proceso los
+libros en bloques de columnas (Xᵀ·X[:, bloque]) en varios procesos y de cada
+bloque solo me quedo con los K mejores vecinos. La memoria por proceso es
+libros x block_size. El resultado es un RuleIndex (rule_index.py), así que se
+consulta igual que las reglas con get_recommendations.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rule_index import RuleIndex
+
+METRICS = ('cosine', 'jaccard')
+
+_worker_state = None
+
+def _init_worker(x, counts, metric, k, min_common):
+    global _worker_state
+    _worker_state = (x, counts, metric, k, min_common)
+
+def _similarity_block(bounds):
+    """
+    Vecinos de los libros [start, stop): devuelvo, por libro del bloque, sus k
+    vecinos ordenados (posiciones), su similitud y los usuarios en común.
+    """
+    start, stop = bounds
+    x, counts, metric, k, min_common = _worker_state
+
+    common = (x.T @ x[:, start:stop]).toarray()            # libros x bloque
+    block_counts = counts[start:stop]
+    if metric == 'cosine':
+        denominator = np.sqrt(np.outer(counts, block_counts))
+    else:
+        denominator = counts[:, None] + block_counts[None, :] - common
+    similarity = np.divide(common, denominator, out=np.zeros_like(common), where=denominator > 0)
+
+    # Un libro no es vecino de sí mismo, ni de libros con pocos usuarios en común
+    similarity[start + np.arange(stop - start), np.arange(stop - start)] = 0
+    similarity[common < min_common] = 0
+
+    k = min(k, similarity.shape[0] - 1)
+    if k <= 0:
+        empty = np.zeros((0, stop - start))
+        return start, empty.astype(np.int64), empty, empty
+    top = np.argpartition(-similarity, k - 1, axis=0)[:k]
+    top_similarity = np.take_along_axis(similarity, top, axis=0)
+    order = np.argsort(-top_similarity, axis=0, kind='stable')
+    top = np.take_along_axis(top, order, axis=0)
+    return (start, top,
+            np.take_along_axis(top_similarity, order, axis=0),
+            np.take_along_axis(common, top, axis=0))
+
+def item_similarity_index(matrix, books_df=None, top_n=10, metric='cosine',
+                          block_size=256, n_jobs=None, min_common=2):
+    """
+    Calculo los top_n vecinos de cada libro de una UserBookMatrix.
+
+    - metric: 'cosine' o 'jaccard'
+    - block_size: libros por bloque (memoria por proceso = libros x block_size x 8 bytes)
+    - n_jobs: procesos a usar (None = todos los núcleos)
+    - min_common: usuarios en común mínimos para considerar vecinos a dos libros
+
+    Devuelvo un RuleIndex en el que confidence es la similitud y lift el
+    número de usuarios en común.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconocida '{metric}'. Opciones: {', '.join(METRICS)}")
+
+    x = matrix.csc.astype(np.float32)
+    counts = np.diff(x.indptr).astype(np.float32)
+    n_books = x.shape[1]
+    blocks = [(start, min(start + block_size, n_books)) for start in range(0, n_books, block_size)]
+
+    if n_jobs is None or n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(blocks)))
+
+    initargs = (x, counts, metric, top_n, min_common)
+    if n_jobs == 1:
+        _init_worker(*initargs)
+        results = list(map(_similarity_block, blocks))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs) as pool:
+            results = list(pool.map(_similarity_block, blocks))
+
+    # Junto los bloques (cada columna es un libro) y quito los vecinos con similitud 0
+    neighbors = np.concatenate([r[1] for r in results], axis=1).T
+    similarity = np.concatenate([r[2] for r in results], axis=1).T
+    common = np.concatenate([r[3] for r in results], axis=1).T
+    valid = similarity > 0
+
+    row_counts = valid.sum(axis=1)
+    has_neighbors = row_counts > 0
+    indptr = np.zeros(int(has_neighbors.sum()) + 1, dtype=np.int64)
+    np.cumsum(row_counts[has_neighbors], out=indptr[1:])
+
+    titles = None
+    if books_df is not None:
+        titles = dict(zip(books_df['id'].tolist(), books_df['title'].astype(str).tolist()))
+
+    # valid está ordenado por fila y, dentro de cada fila, por similitud descendente
+    return RuleIndex(matrix.book_ids[has_neighbors],
+                     indptr,
+                     matrix.book_ids[neighbors[valid]],
+                     similarity[valid],
+                     common[valid],
+                     titles)
@@ -0,0 +1,334 @@
+"""
+Métricas de la web en formato de texto de Prometheus (GET /metrics).
+
+- Consultas SQL: duración por función de models.py que la lanza (eventos
+  before/after_cursor_execute de SQLAlchemy) y consultas por petición.
+- Peticiones HTTP: histograma de latencia por ruta, método y código.
+- Pool de conexiones: tiempo esperando una conexión libre (TimedQueuePool)
+  y conexiones en uso.
+- Errores de las consultas de models.py (los que acaban en una página vacía).
+- Log de consultas lentas (SLOW_QUERY_MS) con su plan (EXPLAIN).
+
+No uso prometheus_client: los contadores son de este proceso. Con gunicorn
+cada worker tiene los suyos y /metrics responde con los del que atiende.
+
+Variables de entorno:
+- METRICS_ENABLED: true/false (por defecto true)
+- SLOW_QUERY_MS: milisegundos a partir de los que se registra una consulta (por defecto 200, 0 = nunca)
+- SLOW_QUERY_EXPLAIN: añadir el EXPLAIN al log (por defecto true)
+- SLOW_QUERY_EXPLAIN_INTERVAL: segundos mínimos entre dos EXPLAIN de la misma consulta (por defecto 60)
+"""
+import os
+import sys
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '60'))
+
+# Límites de los histogramas (segundos y número de consultas)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21)
+
+# Módulo cuyas funciones uso como etiqueta de las consultas
+MODELS_MODULE = 'models'
+
+# Funciones de models.py que solo ejecutan la consulta: el sitio es quien las llama
+QUERY_HELPERS = {'_read'}
+
+class _Metric:
+    """Base de contadores e histogramas: una serie por combinación de etiquetas"""
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, key, names=None):
+        if not key:
+            return ''
+        names = names or self.labelnames
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, key)) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(key, value) for key, value in series)
+        return '\n'.join(lines)
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._series.get(labels, 0)
+
+    def total(self):
+        """Suma de todas las series"""
+        with self._lock:
+            return sum(self._series.values())
+
+    def _render_series(self, key, value):
+        return f"{self.name}{self._labels(key)} {value}"
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Conteos por límite (no acumulados), suma y total
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        names = self.labelnames + ('le',)
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{self._labels(key + (repr(float(bound)),), names)} {cumulative}")
+        lines.append(f"{self.name}_bucket{self._labels(key + ('+Inf',), names)} {count}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return '\n'.join(lines)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# ============================================================================
+# Métricas de la aplicación
+# ============================================================================
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Duración de las peticiones HTTP',
+    ('endpoint', 'method', 'status'))
+http_request_db_queries = Histogram(
+    'http_request_db_queries', 'Consultas SQL por petición HTTP',
+    ('endpoint',), buckets=QUERY_COUNT_BUCKETS)
+db_query_duration = Histogram(
+    'db_query_duration_seconds', 'Duración de las consultas SQL por función de models.py',
+    ('function', 'site'))
+db_slow_queries = Counter(
+    'db_slow_queries_total', 'Consultas por encima de SLOW_QUERY_MS', ('function', 'site'))
+db_errors = Counter(
+    'db_errors_total', 'Consultas de models.py que fallaron (se mostró un resultado vacío)', ('function',))
+db_pool_wait = Histogram(
+    'db_pool_wait_seconds', 'Tiempo esperando una conexión libre del pool')
+db_pool_timeouts = Counter(
+    'db_pool_timeouts_total', 'Esperas de conexión que superaron DB_POOL_TIMEOUT')
+
+_metrics = [http_request_duration, http_request_db_queries, db_query_duration,
+            db_slow_queries, db_errors, db_pool_wait, db_pool_timeouts]
+
+# Engines instrumentados (para leer el estado del pool al exportar)
+_engines = []
+
+# Funciones que añaden líneas a /metrics (ver register_gauges)
+_gauge_sources = []
+
+# Último EXPLAIN de cada consulta lenta (para no repetirlo en cada petición)
+_last_explain = {}
+
+# ============================================================================
+# Pool de conexiones
+# ============================================================================
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión libre"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            db_pool_wait.observe(time.perf_counter() - start)
+
+# ============================================================================
+# Consultas SQL
+# ============================================================================
+
+def _query_origin():
+    """
+    Busco en la pila la función de models.py que lanza la consulta.
+    Devuelvo (función, sitio): la primera función pública de models.py en la
+    cadena de llamadas (get_books, list_books...) y la más interna con su
+    línea, que distingue varias consultas de la misma función.
+    """
+    frame = sys._getframe(2)
+    function = site = None
+    while frame is not None:
+        if frame.f_globals.get('__name__') == MODELS_MODULE and frame.f_code.co_name not in QUERY_HELPERS:
+            name = frame.f_code.co_name
+            if site is None:
+                site = f"{name}:{frame.f_lineno}"
+            function = name
+            if not name.startswith('_'):
+                break
+        frame = frame.f_back
+    if function is None:
+        return 'other', 'other'
+    return function.lstrip('_'), site
+
+def _explain(cursor, statement, parameters, context):
+    """
+    EXPLAIN de la consulta en la misma conexión (con otro cursor, el original
+    aún tiene los resultados) y dentro de un SAVEPOINT para no estropear la
+    transacción si falla
+    """
+    if context is not None and context.executemany:
+        return None
+    try:
+        with cursor.connection.cursor() as explain_cursor:
+            explain_cursor.execute("SAVEPOINT metrics_explain")
+            try:
+                explain_cursor.execute(f"EXPLAIN {statement}", parameters)
+                plan = '\n'.join(row[0] for row in explain_cursor.fetchall())
+                explain_cursor.execute("RELEASE SAVEPOINT metrics_explain")
+                return plan
+            except Exception as e:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT metrics_explain")
+                return f"(EXPLAIN falló: {e})"
+    except Exception as e:
+        return f"(EXPLAIN falló: {e})"
+
+def _log_slow_query(cursor, statement, parameters, context, function, site, elapsed):
+    db_slow_queries.inc(function, site)
+    print(f"🐢 Consulta lenta ({elapsed * 1000:.0f} ms) en {function} [{site}]:\n"
+          f"{statement.strip()}\n  parámetros: {parameters}", flush=True)
+
+    if not SLOW_QUERY_EXPLAIN:
+        return
+    now = time.monotonic()
+    if now - _last_explain.get(site, float('-inf')) < SLOW_QUERY_EXPLAIN_INTERVAL:
+        return
+    _last_explain[site] = now
+    plan = _explain(cursor, statement, parameters, context)
+    if plan:
+        print(f"  plan de {site}:\n{plan}", flush=True)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append((time.perf_counter(), _query_origin()))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('metrics_query_start')
+    if not stack:
+        return
+    start, (function, site) = stack.pop()
+    elapsed = time.perf_counter() - start
+    db_query_duration.observe(elapsed, function, site)
+
+    if has_request_context():
+        g.metrics_db_queries = g.get('metrics_db_queries', 0) + 1
+
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(cursor, statement, parameters, context, function, site, elapsed)
+
+def _handle_error(exception_context):
+    # La consulta falló: no habrá after_cursor_execute, descarto su inicio
+    conn = exception_context.connection
+    stack = conn.info.get('metrics_query_start') if conn is not None else None
+    if stack and not exception_context.is_pre_ping:
+        stack.pop()
+
+def instrument_engine(engine):
+    """Engancho los eventos de consultas al engine (lo llama models.init_db)"""
+    if not METRICS_ENABLED or engine in _engines:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    _engines.append(engine)
+
+def register_gauges(source):
+    """
+    Registro una función sin argumentos que devuelve líneas de métricas ya en
+    formato de Prometheus (estado que vive en otro módulo, como replicas.py)
+    """
+    if METRICS_ENABLED and source not in _gauge_sources:
+        _gauge_sources.append(source)
+
+def record_error(function):
+    """Cuento un error de una consulta de models.py"""
+    db_errors.inc(function)
+
+# ============================================================================
+# Peticiones HTTP y exportación
+# ============================================================================
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_db_queries = 0
+
+def _after_request(response):
+    start = g.get('metrics_start')
+    if start is not None:
+        endpoint = request.endpoint or 'none'
+        http_request_duration.observe(time.perf_counter() - start,
+                                      endpoint, request.method, str(response.status_code))
+        http_request_db_queries.observe(g.get('metrics_db_queries', 0), endpoint)
+    return response
+
+def _pool_gauges():
+    lines = [
+        "# HELP db_pool_checked_out Conexiones del pool en uso",
+        "# TYPE db_pool_checked_out gauge",
+    ]
+    for engine in _engines:
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            url = engine.url
+            # Con socket Unix el host y el puerto van en la query de la URL (?host=/tmp&port=5433)
+            host = url.host or url.query.get('host', 'localhost')
+            port = url.port or url.query.get('port', 5432)
+            lines.append(f'db_pool_checked_out{{database="{_escape(url.database)}",'
+                         f'host="{_escape(host)}:{_escape(port)}"}} {pool.checkedout()}')
+    return '\n'.join(lines)
+
+def render_metrics():
+    """Todas las métricas en formato de texto de Prometheus"""
+    parts = [metric.render() for metric in _metrics]
+    parts.append(_pool_gauges())
+    parts.extend(source() for source in _gauge_sources)
+    return '\n'.join(parts) + '\n'
+
+def metrics_view():
+    """GET /metrics"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app):
+    """Registro los hooks de peticiones y la ruta /metrics"""
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', view_func=metrics_view)
@@ -0,0 +1,231 @@
+"""
+Motores de búsqueda de conjuntos frecuentes de libros.
+
+Todos reciben una UserBookMatrix (recommendation.py) y devuelven un DataFrame
+con las columnas 'support' e 'itemsets' (frozenset de book_id), el mismo
+formato que mlxtend.apriori, así que generate_rules funciona igual con todos.
+
+- 'pairs': cuenta de co-ocurrencias con productos de matrices dispersas
+  (Xᵀ·X por bloques de columnas en varios procesos). Solo conjuntos de 1 y 2
+  libros, que son los que dan reglas {A} -> {B}. Es el más rápido con soportes bajos.
+- 'fpgrowth': FP-Growth de mlxtend repartido en varios procesos al estilo PFP
+  (cada proceso mina los conjuntos cuyo libro menos frecuente es de su grupo).
+- 'apriori': mlxtend.apriori tal cual, como referencia.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth
+from pandas.core.arrays.sparse import IntIndex
+from scipy import sparse
+
+ENGINES = ('pairs', 'fpgrowth', 'apriori')
+
+def _default_jobs(n_jobs):
+    if n_jobs is None or n_jobs <= 0:
+        return os.cpu_count() or 1
+    return n_jobs
+
+def _min_count(min_support, n_transactions):
+    """Número mínimo de usuarios que corresponde a un soporte relativo"""
+    return max(1, math.ceil(min_support * n_transactions - 1e-9))
+
+def _frequent_columns(csc, min_count):
+    """Columnas (libros) que por sí solas ya alcanzan el soporte mínimo, y su cuenta"""
+    counts = np.diff(csc.indptr)
+    columns = np.flatnonzero(counts >= min_count)
+    return columns, counts[columns]
+
+def sparse_bool_frame(matrix, index=None):
+    """
+    DataFrame disperso de pandas (columnas 0..n-1) con las celdas no vacías de
+    matrix a True, el formato que aceptan apriori y fpgrowth de mlxtend.
+    Construyo cada columna ya como Sparse[bool, False]: from_spmatrix usaría
+    fill_value=0 con datos booleanos, que pandas da por obsoleto.
+    """
+    csc = matrix.tocsc()
+    if not csc.has_sorted_indices:
+        csc = csc.sorted_indices()
+    dtype = pd.SparseDtype(bool, False)
+    columns = {}
+    for i in range(csc.shape[1]):
+        rows = csc.indices[csc.indptr[i]:csc.indptr[i + 1]]
+        columns[i] = pd.arrays.SparseArray(np.ones(len(rows), dtype=bool), dtype=dtype,
+                                           sparse_index=IntIndex(csc.shape[0], rows))
+    return pd.DataFrame(columns, index=index, copy=False)
+
+def _itemsets_frame(supports, itemsets):
+    return pd.DataFrame({'support': supports, 'itemsets': itemsets}, columns=['support', 'itemsets'])
+
+# ============================================================================
+# Motor 'pairs': co-ocurrencias por producto de matrices dispersas
+# ============================================================================
+
+_worker_matrix = None
+
+def _init_pairs_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+def _count_pairs_block(args):
+    """
+    Cuento las co-ocurrencias de las columnas [start, stop) con todas las
+    anteriores (triángulo superior) y devuelvo las que llegan al mínimo.
+    """
+    start, stop, min_count = args
+    x = _worker_matrix
+    block = (x[:, :stop].T @ x[:, start:stop]).tocoo()
+    keep = (block.row < block.col + start) & (block.data >= min_count)
+    return block.row[keep], block.col[keep] + start, block.data[keep]
+
+def iter_pair_counts(matrix, min_count=1, n_jobs=None, block_size=512):
+    """
+    Recorro por bloques las parejas de libros (a < b, en posiciones de columna
+    de matrix) con al menos min_count usuarios en común.
+    Cada bloque es (filas, columnas, cuentas); así quien llama puede ir
+    escribiendo los resultados sin tenerlos todos en memoria.
+    """
+    columns, _ = _frequent_columns(matrix.csc, min_count)
+    if len(columns) < 2:
+        return
+
+    # Solo los libros frecuentes pueden formar pares frecuentes (propiedad Apriori)
+    x = matrix.csc[:, columns].astype(np.int32)
+    blocks = [(start, min(start + block_size, len(columns)), min_count)
+              for start in range(0, len(columns), block_size)]
+
+    n_jobs = min(_default_jobs(n_jobs), len(blocks))
+    if n_jobs == 1:
+        _init_pairs_worker(x)
+        for rows, cols, counts in map(_count_pairs_block, blocks):
+            yield columns[rows], columns[cols], counts
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_pairs_worker, initargs=(x,)) as pool:
+            for rows, cols, counts in pool.map(_count_pairs_block, blocks):
+                yield columns[rows], columns[cols], counts
+
+def mine_pairs(matrix, min_support=0.05, max_len=2, n_jobs=None, block_size=512):
+    """Conjuntos frecuentes de 1 y 2 libros contando co-ocurrencias"""
+    if max_len is not None and max_len > 2:
+        raise ValueError("El motor 'pairs' solo encuentra conjuntos de hasta 2 libros; usa engine='fpgrowth'")
+
+    n_users = matrix.shape[0]
+    min_count = _min_count(min_support, n_users)
+    columns, counts = _frequent_columns(matrix.csc, min_count)
+
+    supports = list(counts / n_users)
+    itemsets = [frozenset([matrix.book_ids[c].item()]) for c in columns]
+
+    if max_len != 1:
+        for rows, cols, pair_counts in iter_pair_counts(matrix, min_count, n_jobs=n_jobs, block_size=block_size):
+            supports.extend(pair_counts / n_users)
+            itemsets.extend(frozenset(pair) for pair in zip(matrix.book_ids[rows].tolist(),
+                                                            matrix.book_ids[cols].tolist()))
+
+    return _itemsets_frame(supports, itemsets)
+
+# ============================================================================
+# Motor 'fpgrowth': FP-Growth paralelo (reparto por grupos de libros, PFP)
+# ============================================================================
+
+def _fpgrowth_shard(args):
+    """
+    Mino un fragmento con mlxtend.fpgrowth y me quedo con los conjuntos cuyo
+    libro menos frecuente (mayor rango) es del grupo del fragmento.
+    """
+    shard, shard_ranks, group_mask, min_count, max_len = args
+    n_rows = shard.shape[0]
+    if n_rows == 0:
+        return [], []
+
+    df = sparse_bool_frame(shard)
+    # Pequeño margen para que el redondeo no deje fuera conjuntos con min_count justo
+    found = fpgrowth(df, min_support=(min_count - 0.5) / n_rows, use_colnames=True, max_len=max_len)
+
+    counts, itemsets = [], []
+    for support, items in zip(found['support'], found['itemsets']):
+        ranks = shard_ranks[list(items)]
+        if group_mask[ranks.max()]:
+            counts.append(int(round(support * n_rows)))
+            itemsets.append(ranks)
+    return counts, itemsets
+
+def mine_fpgrowth(matrix, min_support=0.05, max_len=None, n_jobs=None):
+    """Conjuntos frecuentes de cualquier tamaño (hasta max_len) con FP-Growth"""
+    n_users = matrix.shape[0]
+    min_count = _min_count(min_support, n_users)
+    columns, counts = _frequent_columns(matrix.csc, min_count)
+    if len(columns) == 0:
+        return _itemsets_frame([], [])
+
+    # Ordeno los libros frecuentes de más a menos frecuente: ese es su rango
+    order = np.argsort(-counts, kind='stable')
+    columns = columns[order]
+    x = matrix.csc[:, columns].tocsr()
+    x.sort_indices()
+
+    n_jobs = min(_default_jobs(n_jobs), len(columns))
+    # Reparto los rangos en grupos de forma alterna para equilibrar la carga
+    groups = [np.arange(g, len(columns), n_jobs) for g in range(n_jobs)]
+
+    tasks = []
+    for group in groups:
+        group_mask = np.zeros(len(columns), dtype=bool)
+        group_mask[group] = True
+
+        # Para cada usuario, el mayor rango de un libro del grupo que tenga
+        # valorado; su fragmento son sus libros hasta ese rango (el "prefijo")
+        in_group = x[:, group]
+        has_group = np.diff(in_group.indptr) > 0
+        row_limit = np.full(x.shape[0], -1)
+        row_limit[has_group] = np.maximum.reduceat(group[in_group.indices], in_group.indptr[:-1][has_group])
+
+        rows = np.repeat(np.arange(x.shape[0]), np.diff(x.indptr))
+        keep = x.indices <= row_limit[rows]
+        shard = sparse.csr_matrix((x.data[keep], (rows[keep], x.indices[keep])), shape=x.shape)
+        shard = shard[has_group]
+
+        # Columnas del fragmento renumeradas desde 0 (lo exige mlxtend)
+        used = np.unique(shard.indices)
+        shard = shard[:, used]
+        tasks.append((shard, used, group_mask, min_count, max_len))
+
+    if n_jobs == 1:
+        results = map(_fpgrowth_shard, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_fpgrowth_shard, tasks))
+
+    supports, itemsets = [], []
+    for shard_counts, shard_itemsets in results:
+        for count, ranks in zip(shard_counts, shard_itemsets):
+            supports.append(count / n_users)
+            itemsets.append(matrix.to_book_ids(columns[ranks]))
+
+    return _itemsets_frame(supports, itemsets)
+
+# ============================================================================
+# Motor 'apriori': mlxtend tal cual (referencia)
+# ============================================================================
+
+def mine_apriori(matrix, min_support=0.05, max_len=None, n_jobs=None):
+    """mlxtend.apriori sobre la matriz dispersa (un solo proceso)"""
+    found = apriori(matrix.to_dataframe(), min_support=min_support, use_colnames=True, max_len=max_len)
+    found['itemsets'] = found['itemsets'].map(matrix.to_book_ids)
+    return found
+
+def mine_frequent_itemsets(matrix, min_support=0.05, max_len=None, engine='fpgrowth', n_jobs=None):
+    """
+    Busco los conjuntos frecuentes de libros con el motor indicado.
+    n_jobs: procesos a usar (None = todos los núcleos). 'apriori' usa siempre uno.
+    """
+    if engine == 'pairs':
+        return mine_pairs(matrix, min_support=min_support, max_len=2 if max_len is None else max_len, n_jobs=n_jobs)
+    if engine == 'fpgrowth':
+        return mine_fpgrowth(matrix, min_support=min_support, max_len=max_len, n_jobs=n_jobs)
+    if engine == 'apriori':
+        return mine_apriori(matrix, min_support=min_support, max_len=max_len)
+    raise ValueError(f"Motor desconocido '{engine}'. Opciones: {', '.join(ENGINES)}")
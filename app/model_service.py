@@ -0,0 +1,230 @@
+"""
+Modelo de recomendaciones cargado en la web (sin consultar book_recommendations).
+
+recommendation.py necesita pandas y mlxtend, y entrenar lleva minutos: la web
+no lo importa. etl/train_recommendations.py --model-dir publica, además de la
+tabla, un artefacto ya compilado (RuleIndex.save) en una carpeta por versión:
+
+    MODEL_DIR/
+        CURRENT                  # nombre de la versión activa
+        000042-20250101T031500/  # book_ids.npy, indptr.npy, rec_ids.npy,
+        ...                      # confidence.npy, lift.npy y meta.json
+
+publish() escribe la versión nueva entera y después cambia CURRENT con
+os.replace, así que quien lee CURRENT siempre encuentra una versión completa.
+
+En la web:
+- El modelo se carga la primera vez que se pide (get_model), no al arrancar.
+  Los arrays se abren memory-mapped: no se copian a la memoria del proceso y
+  todos los procesos de gunicorn comparten las mismas páginas de la caché del
+  sistema operativo. Cada proceso solo guarda el diccionario book_id -> fila.
+- Un hilo mira CURRENT cada MODEL_CHECK_INTERVAL segundos (y al invalidarse
+  el catálogo). Si cambia, carga la versión nueva fuera de las peticiones y la
+  sustituye de una vez: las peticiones en curso terminan con la anterior.
+  Borrar una versión antigua tampoco les afecta (el mapeo sigue siendo válido).
+- Si no se puede cargar, get_model devuelve el último modelo bueno (o None, y
+  models.py lee la tabla book_recommendations).
+- En /metrics: versión, tiempo de carga, bytes mapeados y en memoria del
+  proceso, cambios de versión y errores de carga.
+
+Variables de entorno:
+- RECOMMENDATION_MODEL_DIR: carpeta de los artefactos (vacío = sin modelo, se lee la tabla)
+- MODEL_CHECK_INTERVAL: segundos entre comprobaciones de CURRENT (por defecto 30)
+"""
+import os
+import shutil
+import sys
+import threading
+import time
+
+from rule_index import RuleIndex
+
+MODEL_DIR = os.getenv('RECOMMENDATION_MODEL_DIR', '')
+MODEL_CHECK_INTERVAL = float(os.getenv('MODEL_CHECK_INTERVAL', '30'))
+
+# Versiones que conserva publish() además de la nueva
+KEEP_VERSIONS = 2
+
+CURRENT_FILE = 'CURRENT'
+
+class LoadedModel:
+    """Un índice cargado con su versión, cuándo y en cuánto tiempo"""
+
+    def __init__(self, version, index, load_seconds):
+        self.version = version
+        self.index = index
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        # Lo que no se comparte entre procesos: el diccionario y sus claves
+        self.heap_bytes = (sys.getsizeof(index.row_index)
+                           + sum(sys.getsizeof(book_id) for book_id in index.row_index))
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'books': len(self.index),
+            'recommendations': len(self.index.rec_ids),
+            'load_seconds': round(self.load_seconds, 4),
+            'mapped_bytes': self.index.nbytes,
+            'heap_bytes': self.heap_bytes,
+            'loaded_at': self.loaded_at,
+        }
+
+# ============================================================================
+# Publicación (etl/train_recommendations.py)
+# ============================================================================
+
+def current_version(model_dir=MODEL_DIR):
+    """Versión activa según CURRENT o None si todavía no hay ninguna"""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish(index, model_dir, catalog_version, **meta):
+    """
+    Guardo index como versión nueva y la activo. Devuelvo el nombre de la versión.
+    Borro las versiones más antiguas salvo las KEEP_VERSIONS anteriores
+    """
+    version = f"{int(catalog_version):06d}-{time.strftime('%Y%m%dT%H%M%S')}"
+    directory = os.path.join(model_dir, version)
+    index.save(directory, version=version, catalog_version=int(catalog_version), **meta)
+
+    tmp_path = os.path.join(model_dir, f'{CURRENT_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+    # Los nombres empiezan por la versión del catálogo: en orden alfabético, de más antigua a más nueva
+    versions = sorted(name for name in os.listdir(model_dir)
+                      if os.path.isdir(os.path.join(model_dir, name)) and name != version)
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(model_dir, old), ignore_errors=True)
+    return version
+
+# ============================================================================
+# Carga en la web
+# ============================================================================
+
+# Modelo en uso. Se sustituye entero (asignar una referencia es atómico)
+_model = None
+_load_lock = threading.Lock()
+_wake_up = threading.Event()
+
+# Última versión que intenté cargar (haya salido bien o no) y si ya se ha pedido el modelo
+_tried_version = None
+_requested = False
+
+_swaps = 0
+_load_errors = 0
+_watcher = None
+
+def load(version, model_dir=MODEL_DIR):
+    """Abro una versión (memory-mapped) y devuelvo el LoadedModel"""
+    start = time.perf_counter()
+    index = RuleIndex.load(os.path.join(model_dir, version))
+    model = LoadedModel(version, index, time.perf_counter() - start)
+    print(f"🧠 Modelo de recomendaciones {version}: {len(index)} libros, "
+          f"{index.nbytes / 1024 ** 2:.1f} MB mapeados, {model.heap_bytes / 1024 ** 2:.1f} MB en memoria, "
+          f"cargado en {model.load_seconds * 1000:.1f} ms", flush=True)
+    return model
+
+def _swap(version):
+    """Cargo version y la pongo en uso; si falla me quedo con el modelo anterior (con el lock)"""
+    global _model, _tried_version, _swaps, _load_errors
+    _tried_version = version
+    if version is None:
+        return
+    try:
+        model = load(version)
+    except Exception as e:
+        _load_errors += 1
+        print(f"⚠️ No se pudo cargar el modelo de recomendaciones {version}: {e}", flush=True)
+        return
+    if _model is not None:
+        _swaps += 1
+    _model = model
+
+def get_model():
+    """
+    Modelo en uso o None (sin RECOMMENDATION_MODEL_DIR o sin versión válida).
+    La primera llamada lo carga; las demás solo leen la referencia
+    """
+    global _requested
+    model = _model
+    if model is not None or not MODEL_DIR or _requested:
+        return model
+    with _load_lock:
+        if not _requested:
+            _swap(current_version())
+            _requested = True
+    return _model
+
+def model_version():
+    model = get_model()
+    return model.version if model is not None else None
+
+def _watch_forever():
+    while True:
+        _wake_up.wait(MODEL_CHECK_INTERVAL)
+        _wake_up.clear()
+        # Hasta que alguien pida el modelo no cargo nada
+        if not _requested:
+            continue
+        version = current_version()
+        if version != _tried_version:
+            with _load_lock:
+                _swap(version)
+
+def model_stats():
+    """Estado del modelo (para /cache/stats) o None si no está cargado"""
+    model = _model
+    return model.stats() if model is not None else None
+
+def metrics_text():
+    """Métricas del modelo en formato de Prometheus (ver metrics.register_gauges)"""
+    model = _model
+    lines = [
+        "# HELP recommendation_model_swaps_total Versiones nuevas del modelo puestas en uso",
+        "# TYPE recommendation_model_swaps_total counter",
+        f"recommendation_model_swaps_total {_swaps}",
+        "# HELP recommendation_model_load_errors_total Versiones del modelo que no se pudieron cargar",
+        "# TYPE recommendation_model_load_errors_total counter",
+        f"recommendation_model_load_errors_total {_load_errors}",
+    ]
+    if model is None:
+        return '\n'.join(lines)
+    lines += [
+        "# HELP recommendation_model_info Versión del modelo de recomendaciones en uso",
+        "# TYPE recommendation_model_info gauge",
+        f'recommendation_model_info{{version="{model.version}"}} 1',
+        "# HELP recommendation_model_load_seconds Tiempo de carga de la versión en uso",
+        "# TYPE recommendation_model_load_seconds gauge",
+        f"recommendation_model_load_seconds {model.load_seconds:.6f}",
+        "# HELP recommendation_model_bytes Tamaño del modelo: mapped (compartido entre procesos) y heap (propio)",
+        "# TYPE recommendation_model_bytes gauge",
+        f'recommendation_model_bytes{{kind="mapped"}} {model.index.nbytes}',
+        f'recommendation_model_bytes{{kind="heap"}} {model.heap_bytes}',
+        "# HELP recommendation_model_books Libros con recomendaciones en el modelo en uso",
+        "# TYPE recommendation_model_books gauge",
+        f"recommendation_model_books {len(model.index)}",
+    ]
+    return '\n'.join(lines)
+
+def init_model_service():
+    """
+    Empiezo a vigilar RECOMMENDATION_MODEL_DIR (sin cargar nada todavía) y
+    registro las métricas. Sin RECOMMENDATION_MODEL_DIR no hace nada
+    """
+    from cache import on_invalidate
+    from metrics import register_gauges
+
+    global _watcher
+    if not MODEL_DIR or _watcher is not None:
+        return
+    register_gauges(metrics_text)
+    # Tras un entrenamiento llega la invalidación del catálogo: miro enseguida si hay versión nueva
+    on_invalidate(_wake_up.set)
+    _watcher = threading.Thread(target=_watch_forever, name='model-watcher', daemon=True)
+    _watcher.start()
@@ -1,22 +1,138 @@
+import numpy as np
 import pandas as pd
 from mlxtend.frequent_patterns import apriori, association_rules
+from scipy import sparse
+import json
 import os
+import time
 
-# Rutas a los archivos CSV
+from mining import mine_frequent_itemsets, sparse_bool_frame
+from item_similarity import item_similarity_index
+from rule_index import RuleIndex
+
+# Rutas a los archivos CSV (por defecto database/; los benchmarks usan otra carpeta)
 BASE_DIR = os.path.dirname(__file__)
-RATINGS_FILE = os.path.join(BASE_DIR, '..', 'database', 'ratings.csv')
-BOOKS_FILE = os.path.join(BASE_DIR, '..', 'database', 'books.csv')
-USER_INFO_FILE = os.path.join(BASE_DIR, '..', 'database', 'user_info.csv')
+DATA_DIR = os.getenv('RECOMMENDATION_DATA_DIR', os.path.join(BASE_DIR, '..', 'database'))
+RATINGS_FILE = os.path.join(DATA_DIR, 'ratings.csv')
+COPIES_FILE = os.path.join(DATA_DIR, 'copies(ejemplares).csv')
+BOOKS_FILE = os.path.join(DATA_DIR, 'books.csv')
+USER_INFO_FILE = os.path.join(DATA_DIR, 'user_info.csv')
+
+# Caché en disco de los CSV ya convertidos (un .npy por columna, se abre con mmap)
+CACHE_DIR = os.getenv('RECOMMENDATION_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+CACHE_FORMAT = 1
+
+# Filas por bloque al leer ratings.csv (acota la memoria del parser)
+CSV_CHUNK_ROWS = 1_000_000
+
+def _source_signature(paths):
+    """Identifico la versión de los CSV por tamaño y fecha de modificación"""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append({'file': os.path.basename(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return {'format': CACHE_FORMAT, 'sources': signature}
+
+def _load_cache(name, paths):
+    """Devuelvo las columnas guardadas de name (memory-mapped) o None si no hay caché válida"""
+    directory = os.path.join(CACHE_DIR, name)
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['signature'] != _source_signature(paths):
+            return None
+        return {column: np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r')
+                for column in meta['columns']}
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_cache(name, paths, columns):
+    """
+    Guardo cada columna en un .npy. meta.json se escribe el último: si el
+    proceso se corta a medias, la caché no se da por válida.
+    """
+    directory = os.path.join(CACHE_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    for column, values in columns.items():
+        tmp_path = os.path.join(directory, f'{column}.npy.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, os.path.join(directory, f'{column}.npy'))
+    
+    tmp_path = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'signature': _source_signature(paths), 'columns': list(columns)}, f)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+def _cached_columns(name, paths, reader, use_cache=True):
+    """Columnas de la caché si los CSV no han cambiado; si no, las leo con reader() y las guardo"""
+    if use_cache:
+        columns = _load_cache(name, paths)
+        if columns is not None:
+            return columns
+    
+    columns = reader()
+    if use_cache:
+        try:
+            _save_cache(name, paths, columns)
+        except OSError as e:
+            print(f"  ⚠️ No se pudo guardar la caché de {name}: {e}")
+    return columns
+
+def _read_ratings():
+    """
+    Leo ratings.csv por bloques con tipos compactos. Las valoraciones son por
+    ejemplar (copy_id): las traduzco a libro con copies(ejemplares).csv.
+    """
+    copies = pd.read_csv(COPIES_FILE, usecols=['copy_id', 'book_id'], dtype=np.int32)
+    copy_to_book = np.full(int(copies['copy_id'].max()) + 1, -1, dtype=np.int32)
+    copy_to_book[copies['copy_id'].to_numpy()] = copies['book_id'].to_numpy()
+    
+    user_ids, book_ids, ratings = [], [], []
+    chunks = pd.read_csv(RATINGS_FILE, usecols=['user_id', 'copy_id', 'rating'], chunksize=CSV_CHUNK_ROWS,
+                         dtype={'user_id': np.int32, 'copy_id': np.int32, 'rating': np.int8})
+    for chunk in chunks:
+        copy_ids = chunk['copy_id'].to_numpy()
+        books = np.full(len(copy_ids), -1, dtype=np.int32)
+        known = (copy_ids >= 0) & (copy_ids < len(copy_to_book))
+        books[known] = copy_to_book[copy_ids[known]]
+        
+        # Descarto las valoraciones de ejemplares que no están en copies
+        valid = books >= 0
+        user_ids.append(chunk['user_id'].to_numpy()[valid])
+        book_ids.append(books[valid])
+        ratings.append(chunk['rating'].to_numpy()[valid])
+    
+    return {
+        'user_id': np.concatenate(user_ids) if user_ids else np.empty(0, dtype=np.int32),
+        'book_id': np.concatenate(book_ids) if book_ids else np.empty(0, dtype=np.int32),
+        'rating': np.concatenate(ratings) if ratings else np.empty(0, dtype=np.int8),
+    }
 
-def load_data():
+def _read_books():
+    books = pd.read_csv(BOOKS_FILE, usecols=['book_id', 'title'], dtype={'book_id': np.int32, 'title': str})
+    return {'id': books['book_id'].to_numpy(), 'title': books['title'].fillna('').to_numpy(dtype=str)}
+
+def _read_user_info():
+    users = pd.read_csv(USER_INFO_FILE, usecols=['user_id', 'sexo'], dtype={'user_id': np.int32, 'sexo': str})
+    return {'user_id': users['user_id'].to_numpy(), 'sexo': users['sexo'].fillna('').to_numpy(dtype=str)}
+
+def load_data(use_cache=True):
     """
     Cargo los datos desde los archivos CSV.
-    Devuelvo tres DataFrames: ratings, books y user_info.
+    Devuelvo tres DataFrames: ratings (user_id, book_id, rating), books (id, title)
+    y user_info (user_id, sexo).
+    
+    La primera vez convierto los CSV a columnas numpy con tipos compactos y las
+    guardo en CACHE_DIR; mientras los CSV no cambien (tamaño y fecha), las
+    siguientes ejecuciones las abren con mmap sin volver a leer los CSV.
     """
     # Primero verifico que existan los archivos
     missing_files = []
     if not os.path.exists(RATINGS_FILE):
         missing_files.append(f"ratings.csv en {RATINGS_FILE}")
+    if not os.path.exists(COPIES_FILE):
+        missing_files.append(f"copies(ejemplares).csv en {COPIES_FILE}")
     if not os.path.exists(BOOKS_FILE):
         missing_files.append(f"books.csv en {BOOKS_FILE}")
     if not os.path.exists(USER_INFO_FILE):
@@ -29,59 +145,121 @@ def load_data():
         for file in missing_files:
             print(f"  ❌ No se encontró: {file}")
         print("\nAsegúrate de tener estos archivos en la carpeta /database:")
-        print("  - ratings.csv (user_id, book_id, rating)")
-        print("  - books.csv (id, title)")
-        print("  - user_info.csv (id, nombre)")
+        print("  - ratings.csv (user_id, copy_id, rating)")
+        print("  - copies(ejemplares).csv (copy_id, book_id)")
+        print("  - books.csv (book_id, title, ...)")
+        print("  - user_info.csv (user_id, sexo, ...)")
         print("=" * 60)
         return None, None, None
     
     try:
-        ratings = pd.read_csv(RATINGS_FILE)
-        books = pd.read_csv(BOOKS_FILE)
-        user_info = pd.read_csv(USER_INFO_FILE)
+        start = time.perf_counter()
+        ratings = pd.DataFrame(_cached_columns('ratings', [RATINGS_FILE, COPIES_FILE], _read_ratings, use_cache))
+        books = pd.DataFrame(_cached_columns('books', [BOOKS_FILE], _read_books, use_cache))
+        user_info = pd.DataFrame(_cached_columns('user_info', [USER_INFO_FILE], _read_user_info, use_cache))
+        user_info['sexo'] = user_info['sexo'].astype('category')
         
-        print(f"✅ Datos cargados: {len(ratings)} valoraciones, {len(books)} libros, {len(user_info)} usuarios")
+        print(f"✅ Datos cargados: {len(ratings)} valoraciones, {len(books)} libros, {len(user_info)} usuarios "
+              f"en {time.perf_counter() - start:.2f} s")
         return ratings, books, user_info
     
     except Exception as e:
         print(f"Error al cargar los datos: {e}")
         return None, None, None
 
+class UserBookMatrix:
+    """
+    Matriz usuario-libro dispersa.
+    
+    - csr: matriz scipy CSR booleana (filas = usuarios, columnas = libros)
+    - user_ids / book_ids: arrays con el id real de cada fila / columna
+    - user_index / book_index: diccionarios id real -> posición
+    
+    Solo se guardan las celdas a True, así que 53k usuarios x 10k libros ocupan
+    lo que ocupan las valoraciones positivas y no 500M de celdas.
+    """
+    
+    def __init__(self, csr, user_ids, book_ids):
+        self.csr = csr
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids.tolist())}
+        self.book_index = {book_id: i for i, book_id in enumerate(book_ids.tolist())}
+        self._csc = None
+    
+    @property
+    def shape(self):
+        return self.csr.shape
+    
+    @property
+    def csc(self):
+        """La misma matriz por columnas (para recorrer los usuarios de cada libro)"""
+        if self._csc is None:
+            self._csc = self.csr.tocsc()
+        return self._csc
+    
+    @property
+    def nbytes(self):
+        return self.csr.data.nbytes + self.csr.indices.nbytes + self.csr.indptr.nbytes
+    
+    def to_dataframe(self):
+        """
+        DataFrame disperso de pandas, el formato que acepta mlxtend.
+        Las columnas son las posiciones 0..n-1 (mlxtend exige que los nombres
+        enteros de un DataFrame disperso empiecen en 0); book_ids las traduce.
+        """
+        return sparse_bool_frame(self.csc, index=self.user_ids)
+    
+    def to_book_ids(self, positions):
+        """Traduzco un conjunto de posiciones de columna a sus book_id"""
+        return frozenset(self.book_ids[i].item() for i in positions)
+
 def create_user_book_matrix(ratings_df):
     """
     Creo una matriz usuario-libro con valores binarios.
     Si rating >= 4, marco 1 (el usuario recomienda el libro).
     Si rating < 4, marco 0.
+    La matriz es dispersa (ver UserBookMatrix): la construyo directamente a
+    partir de los índices enteros de usuario y libro, sin pivot_table.
     """
     # Filtro solo ratings >= 4 (recomendaciones positivas)
-    recommendations = ratings_df[ratings_df['rating'] >= 4].copy()
+    positive = ratings_df['rating'].to_numpy() >= 4
+    users = ratings_df['user_id'].to_numpy()[positive]
+    books = ratings_df['book_id'].to_numpy()[positive]
     
-    # Creo una columna auxiliar con valor 1
-    recommendations['recommended'] = 1
+    # Codifico los ids como posiciones 0..n-1 (ordenadas por id)
+    user_codes, user_ids = pd.factorize(users, sort=True)
+    book_codes, book_ids = pd.factorize(books, sort=True)
     
-    # Genero la matriz pivotada: filas=usuarios, columnas=libros, valores=1 o 0
-    user_book_matrix = recommendations.pivot_table(
-        index='user_id',
-        columns='book_id',
-        values='recommended',
-        fill_value=0
-    )
+    # Cada valoración positiva es un 1; los duplicados se suman y luego paso a booleano
+    values = np.ones(len(user_codes), dtype=np.int8)
+    matrix = sparse.coo_matrix((values, (user_codes, book_codes)),
+                               shape=(len(user_ids), len(book_ids))).tocsr()
+    matrix.sum_duplicates()
+    matrix = matrix.astype(bool)
     
-    # Convierto a tipo booleano (True/False) para Apriori
-    user_book_matrix = user_book_matrix.astype(bool)
+    user_book_matrix = UserBookMatrix(matrix, np.asarray(user_ids), np.asarray(book_ids))
     
-    print(f"Matriz usuario-libro creada: {user_book_matrix.shape[0]} usuarios x {user_book_matrix.shape[1]} libros")
+    print(f"Matriz usuario-libro creada: {user_book_matrix.shape[0]} usuarios x {user_book_matrix.shape[1]} libros "
+          f"({matrix.nnz} valoraciones positivas, {user_book_matrix.nbytes / 1024 / 1024:.1f} MB)")
     return user_book_matrix
 
-def apply_apriori(user_book_matrix, min_support=0.05):
+def apply_apriori(user_book_matrix, min_support=0.05, engine='fpgrowth', max_len=None, n_jobs=None):
     """
-    Aplico el algoritmo Apriori para encontrar conjuntos frecuentes de libros.
+    Busco los conjuntos frecuentes de libros (ver mining.py).
     min_support: soporte mínimo (por defecto 5% de usuarios)
+    engine: 'fpgrowth' (por defecto), 'pairs' (solo parejas, el más rápido) o 'apriori' (mlxtend)
+    max_len: tamaño máximo de los conjuntos (None = sin límite; 'pairs' usa 2)
+    n_jobs: procesos a usar (None = todos los núcleos)
     """
-    print(f"Aplicando Apriori con soporte mínimo de {min_support}...")
+    print(f"Buscando conjuntos frecuentes ({engine}) con soporte mínimo de {min_support}...")
     
-    # Encuentro los conjuntos frecuentes de libros
-    frequent_itemsets = apriori(user_book_matrix, min_support=min_support, use_colnames=True)
+    if isinstance(user_book_matrix, UserBookMatrix):
+        frequent_itemsets = mine_frequent_itemsets(user_book_matrix, min_support=min_support,
+                                                   max_len=max_len, engine=engine, n_jobs=n_jobs)
+    else:
+        # DataFrame denso usuario x libro (formato anterior): mlxtend directamente
+        frequent_itemsets = apriori(user_book_matrix, min_support=min_support, use_colnames=True, max_len=max_len)
     
     print(f"Se encontraron {len(frequent_itemsets)} conjuntos frecuentes")
     return frequent_itemsets
@@ -103,6 +281,28 @@ def generate_rules(frequent_itemsets, min_confidence=0.6):
     print(f"Se generaron {len(rules)} reglas de asociación")
     return rules
 
+def build_rule_index(rules_df, books_df, top_n=10):
+    """
+    Compilo las reglas en un RuleIndex (ver rule_index.py) para poder
+    consultar las recomendaciones de muchos libros sin recorrer las reglas.
+    """
+    index = RuleIndex.from_rules(rules_df, books_df, top_n=top_n)
+    print(f"Índice de reglas creado: {len(index)} libros con recomendaciones "
+          f"({index.nbytes / 1024:.1f} KB)")
+    return index
+
+def build_similarity_index(user_book_matrix, books_df, top_n=10, metric='cosine', n_jobs=None):
+    """
+    Calculo los libros más parecidos a cada libro (filtrado colaborativo, ver
+    item_similarity.py). Da recomendaciones también a los libros que no llegan
+    al soporte mínimo de las reglas. Se consulta igual que build_rule_index.
+    """
+    print(f"Calculando similitud libro-libro ({metric}, top {top_n})...")
+    index = item_similarity_index(user_book_matrix, books_df, top_n=top_n, metric=metric, n_jobs=n_jobs)
+    print(f"Índice de similitud creado: {len(index)} libros con vecinos "
+          f"({index.nbytes / 1024:.1f} KB)")
+    return index
+
 def get_recommendations(book_title, books_df, rules_df, top_n=3):
     """
     Obtengo recomendaciones de libros basadas en el título dado.
@@ -110,44 +310,25 @@ def get_recommendations(book_title, books_df, rules_df, top_n=3):
     Parámetros:
     - book_title: título del libro para el cual buscar recomendaciones
     - books_df: DataFrame con información de libros (id, title)
-    - rules_df: DataFrame con reglas de asociación
+    - rules_df: RuleIndex (build_rule_index o build_similarity_index) o DataFrame con reglas de asociación.
+      Con un DataFrame compilo el índice en cada llamada: para consultar varias
+      veces hay que pasar el índice ya construido.
     - top_n: número de recomendaciones a devolver
     
     Devuelvo: lista de tuplas (título, confianza)
     """
-    # Busco el book_id del título dado
-    book_match = books_df[books_df['title'].str.lower() == book_title.lower()]
+    if isinstance(rules_df, RuleIndex):
+        index = rules_df
+    else:
+        index = RuleIndex.from_rules(rules_df, books_df, top_n=top_n)
     
-    if book_match.empty:
+    if index.book_id_for_title(book_title) is None:
         print(f"No se encontró el libro '{book_title}'")
         return []
     
-    book_id = book_match.iloc[0]['id']
-    
-    # Busco reglas donde el libro aparezca en el antecedente
-    # Las reglas tienen formato: {libro_base} -> {libro_recomendado}
-    relevant_rules = rules_df[rules_df['antecedents'].apply(lambda x: book_id in x)]
-    
-    if relevant_rules.empty:
+    recommendations = index.recommend_title(book_title, top_n=top_n)
+    if not recommendations:
         print(f"No hay recomendaciones disponibles para '{book_title}'")
-        return []
-    
-    # Ordeno por confianza descendente
-    relevant_rules = relevant_rules.sort_values('confidence', ascending=False)
-    
-    # Extraigo las recomendaciones
-    recommendations = []
-    for _, row in relevant_rules.head(top_n).iterrows():
-        # Obtengo el libro recomendado del consecuente
-        recommended_book_id = list(row['consequents'])[0]
-        
-        # Busco el título del libro
-        book_info = books_df[books_df['id'] == recommended_book_id]
-        if not book_info.empty:
-            book_title_rec = book_info.iloc[0]['title']
-            confidence = row['confidence']
-            recommendations.append((book_title_rec, confidence))
-    
     return recommendations
 
 def main():
@@ -184,6 +365,10 @@ def main():
         print("No se pudieron generar reglas. Intenta reducir el umbral de confianza.")
         return
     
+    # Compilo las reglas una sola vez para todas las consultas
+    rule_index = build_rule_index(rules, books_df)
+    print()
+    
     # Ejemplo: buscar recomendaciones para un libro
     print("=" * 60)
     print("EJEMPLO DE RECOMENDACIONES")
@@ -198,7 +383,7 @@ def main():
         print(f"(Usando '{example_book}' como ejemplo)")
     
     print(f"\nRecomendaciones para '{example_book}':")
-    recommendations = get_recommendations(example_book, books_df, rules, top_n=3)
+    recommendations = get_recommendations(example_book, books_df, rule_index, top_n=3)
     
     if recommendations:
         for i, (title, confidence) in enumerate(recommendations, 1):
@@ -206,9 +391,19 @@ def main():
     else:
         print("  No hay recomendaciones disponibles para este libro.")
     
+    # Las mismas consultas con el índice de similitud (cubre también los libros sin reglas)
+    similarity_index = build_similarity_index(user_book_matrix, books_df)
+    print(f"\nLibros parecidos a '{example_book}':")
+    similar = get_recommendations(example_book, books_df, similarity_index, top_n=3)
+    
+    if similar:
+        for i, (title, similarity) in enumerate(similar, 1):
+            print(f"  {i}. {title} (similitud: {similarity:.2f})")
+    else:
+        print("  No hay libros parecidos para este libro.")
+    
     print()
     print("=" * 60)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,195 @@
+"""
+Réplicas de lectura de PostgreSQL para las consultas de models.py.
+
+Las lecturas de la web (listados, búsqueda, fichas, recomendaciones) pueden ir
+a una o varias réplicas en streaming, y el primario queda para el ETL, el
+refresco de las vistas y el hilo LISTEN de cache.py (NOTIFY solo llega en el
+primario). Cada réplica es un bind de Flask-SQLAlchemy (replica0, replica1...)
+con su propio pool.
+
+Un hilo comprueba cada REPLICA_CHECK_INTERVAL segundos cada réplica:
+- que responde y está en recuperación (es una réplica de verdad)
+- su retraso: 0 si ya ha aplicado todo lo recibido, si no el tiempo desde la
+  última transacción aplicada
+- la versión del catálogo que ve (tabla catalog_version, migración 004)
+
+Una réplica solo recibe lecturas si responde, su retraso no pasa de
+REPLICA_MAX_LAG_SECONDS (si está definido) y ya tiene la versión del catálogo
+que conoce la web. Así, tras un ETL, la web no vuelve a llenar las cachés con
+datos de una réplica que aún no ha aplicado el cambio: lee del primario hasta
+que la réplica lo alcanza (al invalidar se vuelve a comprobar enseguida).
+Sin réplicas sanas, todo va al primario.
+
+Variables de entorno:
+- DATABASE_REPLICA_URLS: URLs de las réplicas separadas por comas (vacío = sin réplicas)
+- REPLICA_MAX_LAG_SECONDS: retraso máximo tolerado (por defecto 0 = sin límite)
+- REPLICA_CHECK_INTERVAL: segundos entre comprobaciones (por defecto 5)
+"""
+import itertools
+import os
+import threading
+
+from sqlalchemy import text
+
+from cache import catalog_version, on_invalidate
+
+REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '0'))
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '5'))
+
+# Retraso de una réplica: 0 si ya ha aplicado todo el WAL que el primario había
+# escrito justo antes de la comprobación (:primary_lsn); si no, el tiempo desde
+# la última transacción aplicada. Sin primario (caído) me fío de lo recibido
+HEALTH_CHECK_SQL = """
+    SELECT pg_is_in_recovery(),
+           CASE WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN CAST(:primary_lsn AS pg_lsn) IS NOT NULL
+                     AND pg_last_wal_replay_lsn() >= CAST(:primary_lsn AS pg_lsn) THEN 0
+                WHEN CAST(:primary_lsn AS pg_lsn) IS NULL
+                     AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END::float8,
+           (SELECT max(version) FROM catalog_version)
+"""
+
+class Replica:
+    """Estado de una réplica según la última comprobación"""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.up = False
+        self.in_recovery = None
+        self.lag = None
+        self.catalog_version = None
+        self.error = None
+
+    def usable(self):
+        """¿Puede recibir lecturas ahora?"""
+        if not self.up:
+            return False
+        if REPLICA_MAX_LAG_SECONDS > 0 and (self.lag is None or self.lag > REPLICA_MAX_LAG_SECONDS):
+            return False
+        return (self.catalog_version or 0) >= catalog_version()
+
+_primary = None
+_replicas = []
+_round_robin = itertools.count()
+_wake_up = threading.Event()
+
+# Lecturas que acabaron en el primario teniendo réplicas, por motivo (para /metrics)
+_fallbacks = {}
+_fallbacks_lock = threading.Lock()
+
+def _count_fallback(reason):
+    with _fallbacks_lock:
+        _fallbacks[reason] = _fallbacks.get(reason, 0) + 1
+
+def _primary_lsn():
+    """Posición actual del WAL en el primario (None si no responde)"""
+    try:
+        with _primary.connect() as conn:
+            return conn.exec_driver_sql("SELECT pg_current_wal_lsn()::text").scalar()
+    except Exception:
+        return None
+
+def check(replica, primary_lsn=None):
+    """Compruebo una réplica y actualizo su estado"""
+    was_up = replica.up
+    try:
+        with replica.engine.connect() as conn:
+            in_recovery, lag, version = conn.execute(text(HEALTH_CHECK_SQL),
+                                                     {'primary_lsn': primary_lsn}).fetchone()
+        replica.in_recovery, replica.lag, replica.catalog_version = in_recovery, lag, version
+        replica.up, replica.error = True, None
+        if not in_recovery:
+            replica.error = 'no está en recuperación (¿es el primario?)'
+    except Exception as e:
+        replica.up, replica.error = False, str(e).strip().splitlines()[0]
+
+    if replica.up and not was_up:
+        print(f"✅ Réplica {replica.name} disponible (retraso {replica.lag:.1f} s, "
+              f"versión {replica.catalog_version})", flush=True)
+    elif was_up and not replica.up:
+        print(f"⚠️ Réplica {replica.name} caída, lecturas al primario: {replica.error}", flush=True)
+
+def _check_forever():
+    while True:
+        _wake_up.wait(REPLICA_CHECK_INTERVAL)
+        _wake_up.clear()
+        primary_lsn = _primary_lsn()
+        for replica in _replicas:
+            check(replica, primary_lsn)
+
+def pick_engine():
+    """
+    Devuelvo el engine de una réplica utilizable (por turnos) o None si las
+    lecturas tienen que ir al primario
+    """
+    if not _replicas:
+        return None
+    usable = [replica for replica in _replicas if replica.usable()]
+    if not usable:
+        _count_fallback('unavailable')
+        return None
+    return usable[next(_round_robin) % len(usable)].engine
+
+def replica_failed(engine, error, down):
+    """
+    Una consulta en la réplica de engine ha fallado y se repite en el primario.
+    Con down=True (conexión perdida) la doy por caída hasta la próxima comprobación
+    """
+    _count_fallback('error')
+    for replica in _replicas:
+        if replica.engine is engine:
+            if down and replica.up:
+                replica.up, replica.error = False, str(error).strip().splitlines()[0]
+                print(f"⚠️ Réplica {replica.name} caída, lecturas al primario: {replica.error}", flush=True)
+            _wake_up.set()
+
+def metrics_text():
+    """Métricas de las réplicas en formato de Prometheus (ver metrics.register_gauges)"""
+    lines = [
+        "# HELP db_replica_usable Réplica recibiendo lecturas (1) o no (0)",
+        "# TYPE db_replica_usable gauge",
+    ]
+    lines += [f'db_replica_usable{{replica="{r.name}"}} {int(r.usable())}' for r in _replicas]
+    lines += [
+        "# HELP db_replica_lag_seconds Retraso de la réplica en la última comprobación",
+        "# TYPE db_replica_lag_seconds gauge",
+    ]
+    lines += [f'db_replica_lag_seconds{{replica="{r.name}"}} {r.lag}' for r in _replicas if r.lag is not None]
+    lines += [
+        "# HELP db_replica_fallbacks_total Lecturas enviadas al primario teniendo réplicas",
+        "# TYPE db_replica_fallbacks_total counter",
+    ]
+    with _fallbacks_lock:
+        lines += [f'db_replica_fallbacks_total{{reason="{reason}"}} {count}'
+                  for reason, count in sorted(_fallbacks.items())]
+    return '\n'.join(lines)
+
+def replica_binds(engine_options):
+    """SQLALCHEMY_BINDS con una entrada por réplica de DATABASE_REPLICA_URLS"""
+    return {f'replica{i}': {'url': url, **engine_options} for i, url in enumerate(REPLICA_URLS)}
+
+def init_replicas(primary, engines):
+    """
+    Empiezo a vigilar las réplicas (engines: nombre del bind -> engine) contra
+    el engine del primario. La primera comprobación es inmediata, antes de
+    atender peticiones
+    """
+    global _primary
+    if not engines or _replicas:
+        return
+    _primary = primary
+    primary_lsn = _primary_lsn()
+    for name, engine in sorted(engines.items()):
+        replica = Replica(name, engine)
+        check(replica, primary_lsn)
+        if not replica.up:
+            print(f"⚠️ Réplica {name} no disponible: {replica.error}", flush=True)
+        _replicas.append(replica)
+
+    # Al cambiar el catálogo, vuelvo a mirar qué versión tiene cada réplica
+    on_invalidate(_wake_up.set)
+    threading.Thread(target=_check_forever, name='replica-health-check', daemon=True).start()
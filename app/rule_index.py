@@ -0,0 +1,184 @@
+"""
+Índice compilado de reglas de asociación para recomendar en O(1).
+
+generate_rules devuelve un DataFrame con una fila por regla. Buscar en él las
+reglas de un libro obliga a recorrer todas las reglas (y todos los títulos)
+en cada consulta. RuleIndex se construye una sola vez a partir de las reglas
+y guarda, para cada libro, sus recomendaciones ya ordenadas y sin repetir en
+arrays contiguos (formato CSR):
+
+    rec_ids[indptr[i]:indptr[i + 1]]  -> recomendaciones del libro en la fila i
+
+Una consulta es un acceso a diccionario más un corte de arrays. Solo depende
+de numpy, así que se puede cargar en la web sin pandas ni mlxtend.
+
+save() guarda los arrays en una carpeta (un .npy por array) y load() los abre
+memory-mapped: varios procesos que cargan la misma carpeta comparten las
+páginas en la caché del sistema operativo (ver model_service.py).
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+# Arrays que se guardan con save(), con el tipo con el que los usa RuleIndex
+# (así load() no tiene que convertirlos ni copiarlos a memoria propia)
+ARRAYS = {
+    'book_ids': np.int64,
+    'indptr': np.int64,
+    'rec_ids': np.int64,
+    'confidence': np.float64,
+    'lift': np.float64,
+}
+
+def normalize_title(title):
+    """Título en minúsculas y con los espacios normalizados (clave de búsqueda)"""
+    return re.sub(r'\s+', ' ', str(title)).strip().casefold()
+
+class RuleIndex:
+    """
+    Recomendaciones precalculadas por libro.
+
+    - indptr: inicio de las recomendaciones de cada fila (len = libros + 1)
+    - book_ids: book_id de cada fila
+    - rec_ids / confidence / lift: recomendaciones, ordenadas por confianza y lift descendentes
+      (en un índice de item_similarity.py, confidence es la similitud y lift los usuarios en común)
+    - titles: book_id -> título; title_index: título normalizado -> book_id
+    - meta: datos guardados con save() (versión, parámetros...), vacío si no viene de load()
+    """
+
+    def __init__(self, book_ids, indptr, rec_ids, confidence, lift, titles=None):
+        self.book_ids = np.asarray(book_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.rec_ids = np.asarray(rec_ids, dtype=np.int64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.lift = np.asarray(lift, dtype=np.float64)
+        self.row_index = {book_id: i for i, book_id in enumerate(self.book_ids.tolist())}
+        self.titles = dict(titles or {})
+        self.title_index = {}
+        for book_id, title in self.titles.items():
+            # Si hay títulos repetidos me quedo con el primero, como hacía la búsqueda anterior
+            self.title_index.setdefault(normalize_title(title), book_id)
+        self.meta = {}
+
+    @classmethod
+    def from_rules(cls, rules_df, books_df=None, top_n=10):
+        """
+        Compilo el DataFrame de generate_rules.
+        Cada regla {A, B} -> {C, D} aporta C y D como recomendación de A y de B;
+        si un par (libro, recomendado) sale en varias reglas me quedo con la de
+        mayor confianza. Guardo como mucho top_n recomendaciones por libro.
+        """
+        titles = {}
+        if books_df is not None:
+            titles = dict(zip(books_df['id'].tolist(), books_df['title'].astype(str).tolist()))
+
+        sources, targets, confidences, lifts = [], [], [], []
+        if rules_df is not None and len(rules_df):
+            for antecedents, consequents, confidence, lift in zip(
+                    rules_df['antecedents'], rules_df['consequents'], rules_df['confidence'], rules_df['lift']):
+                for source in antecedents:
+                    for target in consequents:
+                        if source != target:
+                            sources.append(source)
+                            targets.append(target)
+                            confidences.append(confidence)
+                            lifts.append(lift)
+
+        if not sources:
+            return cls([], [0], [], [], [], titles)
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        lifts = np.asarray(lifts, dtype=np.float64)
+
+        # Orden: libro, confianza desc., lift desc., recomendado (para que sea estable)
+        order = np.lexsort((targets, -lifts, -confidences, sources))
+        sources, targets, confidences, lifts = sources[order], targets[order], confidences[order], lifts[order]
+
+        # Quito pares repetidos quedándome con el primero (el de mayor confianza)
+        pairs = np.stack([sources, targets], axis=1)
+        _, first = np.unique(pairs, axis=0, return_index=True)
+        keep = np.zeros(len(sources), dtype=bool)
+        keep[first] = True
+        sources, targets, confidences, lifts = sources[keep], targets[keep], confidences[keep], lifts[keep]
+
+        # Posición de cada recomendación dentro de su libro, para recortar a top_n
+        book_ids, starts, counts = np.unique(sources, return_index=True, return_counts=True)
+        rank = np.arange(len(sources)) - np.repeat(starts, counts)
+        keep = rank < top_n
+        targets, confidences, lifts = targets[keep], confidences[keep], lifts[keep]
+
+        indptr = np.zeros(len(book_ids) + 1, dtype=np.int64)
+        np.cumsum(np.minimum(counts, top_n), out=indptr[1:])
+        return cls(book_ids, indptr, targets, confidences, lifts, titles)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Abro un índice guardado con save(). Con mmap_mode='r' los arrays no se
+        leen enteros: se mapean y el sistema carga las páginas según se consultan
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('arrays') != list(ARRAYS):
+            raise ValueError(f"{directory}: arrays {meta.get('arrays')}, se esperaban {list(ARRAYS)}")
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in ARRAYS}
+        for name, dtype in ARRAYS.items():
+            if arrays[name].dtype != dtype:
+                raise ValueError(f"{directory}: {name} es {arrays[name].dtype}, se esperaba {np.dtype(dtype)}")
+        index = cls(**arrays)
+        index.meta = meta
+        return index
+
+    def save(self, directory, **meta):
+        """
+        Guardo los arrays en directory (un .npy cada uno, sin títulos) y meta.json
+        con meta, que se escribe el último: una carpeta a medias no se puede cargar
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in ARRAYS.items():
+            np.save(os.path.join(directory, f'{name}.npy'), np.asarray(getattr(self, name), dtype=dtype))
+        tmp_path = os.path.join(directory, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({**meta, 'arrays': list(ARRAYS), 'books': len(self),
+                       'recommendations': len(self.rec_ids)}, f)
+        os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.book_ids, self.indptr, self.rec_ids, self.confidence, self.lift))
+
+    def book_id_for_title(self, title):
+        """book_id de un título (sin distinguir mayúsculas) o None"""
+        return self.title_index.get(normalize_title(title))
+
+    def recommend(self, book_id, top_n=3):
+        """Lista de (book_id, confianza, lift) recomendados para un libro"""
+        row = self.row_index.get(book_id)
+        if row is None:
+            return []
+        start = self.indptr[row]
+        stop = min(self.indptr[row + 1], start + top_n)
+        return list(zip(self.rec_ids[start:stop].tolist(),
+                        self.confidence[start:stop].tolist(),
+                        self.lift[start:stop].tolist()))
+
+    def recommend_many(self, book_ids, top_n=3):
+        """Recomendaciones de varios libros a la vez: {book_id: [(book_id, confianza, lift), ...]}"""
+        return {book_id: self.recommend(book_id, top_n) for book_id in book_ids}
+
+    def recommend_title(self, title, top_n=3):
+        """Lista de (título, confianza) recomendados para un título"""
+        book_id = self.book_id_for_title(title)
+        if book_id is None:
+            return []
+        return [(self.titles[rec_id], confidence)
+                for rec_id, confidence, _ in self.recommend(book_id, top_n)
+                if rec_id in self.titles]
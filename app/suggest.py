@@ -0,0 +1,178 @@
+"""
+Autocompletado de títulos y autores en memoria (GET /api/suggest?q=).
+
+Cada pulsación del buscador pediría una búsqueda en PostgreSQL. El catálogo
+son unos 10k libros y solo cambia con el ETL, así que cada proceso de la web
+guarda un índice de prefijos y responde sin tocar la base de datos:
+
+- keys: lista ordenada de claves normalizadas (minúsculas, sin acentos ni
+  signos, como f_normalize_search en PostgreSQL). Cada libro aporta el título
+  y el nombre de cada autor completos y a partir de cada palabra, para que
+  "potter" o "rowling" encuentren "Harry Potter..." de J.K. Rowling.
+  Las claves se cortan a MAX_KEY_LENGTH caracteres.
+- rows: array numpy (int32) con la fila del libro de cada clave.
+- Las filas van ordenadas por popularidad (num_ratings de mv_top_rated_books),
+  así que la fila más baja es el libro más valorado.
+
+Una consulta son dos bisect sobre keys (el rango de claves que empiezan por el
+prefijo) y np.unique sobre sus filas, que devuelve los libros ordenados por
+popularidad. Para los prefijos de una o dos letras, que abarcan miles de
+claves, el resultado se precalcula al construir el índice.
+
+El índice se construye al arrancar (create_app) y se reconstruye cuando
+cambia el catálogo (cache.on_invalidate), y se sustituye de una vez: las
+peticiones en curso siguen usando el anterior.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from cache import on_invalidate
+
+# Sugerencias por defecto y máximo que se puede pedir con ?limit=
+SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', '8'))
+SUGGEST_MAX_LIMIT = 20
+
+# Las claves más largas no aportan nada para autocompletar y ocupan memoria
+MAX_KEY_LENGTH = 32
+
+# Prefijos con resultado precalculado (los de 1 y 2 letras)
+SHORT_PREFIX_LENGTH = 2
+
+# Mayor que cualquier carácter: cierra el rango de claves que empiezan por un prefijo
+_KEY_END = '\U0010ffff'
+
+_NON_ALNUM = re.compile(r'[^\w]+|_')
+
+def normalize(text):
+    """Minúsculas, sin acentos y con signos de puntuación como espacios"""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text.casefold()).strip()
+
+def _word_suffixes(text):
+    """El texto normalizado a partir de cada palabra: 'a b c' -> 'a b c', 'b c', 'c'"""
+    words = normalize(text).split()
+    return {' '.join(words[i:])[:MAX_KEY_LENGTH] for i in range(len(words))}
+
+class SuggestIndex:
+    """
+    Índice de prefijos de títulos y autores.
+
+    - book_ids / titles / authors / popularity: datos de cada fila (libro),
+      de más a menos popular
+    - keys / rows: claves ordenadas y la fila del libro de cada una
+    - short: prefijo corto -> filas precalculadas (SUGGEST_MAX_LIMIT como máximo)
+    """
+
+    def __init__(self, rows):
+        # Más valoraciones primero; a igualdad, el book_id más bajo
+        books = sorted(rows, key=lambda row: (-int(row[3] or 0), row[0]))
+        self.book_ids = np.array([row[0] for row in books], dtype=np.int32)
+        self.titles = [row[1] or 'Sin título' for row in books]
+        self.authors = [row[2] or 'Desconocido' for row in books]
+        self.popularity = np.array([int(row[3] or 0) for row in books], dtype=np.int64)
+
+        entries = set()
+        for i, (title, authors) in enumerate(zip(self.titles, self.authors)):
+            for key in _word_suffixes(title):
+                entries.add((key, i))
+            for author in authors.split(','):
+                for key in _word_suffixes(author):
+                    entries.add((key, i))
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.rows = np.array([i for _, i in entries], dtype=np.int32)
+
+        self.short = {}
+        prefixes = {key[:n] for key in self.keys for n in range(1, SHORT_PREFIX_LENGTH + 1)}
+        for prefix in prefixes:
+            self.short[prefix] = self._match(prefix)[:SUGGEST_MAX_LIMIT]
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def _match(self, prefix):
+        """Filas de los libros con alguna clave que empieza por prefix, por popularidad"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _KEY_END, lo)
+        return np.unique(self.rows[lo:hi])
+
+    def suggest(self, q, limit=SUGGEST_LIMIT):
+        """Devuelvo hasta limit libros cuyo título o autor tiene una palabra que empieza por q"""
+        prefix = normalize(q)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        rows = self.short.get(prefix) if len(prefix) <= SHORT_PREFIX_LENGTH else None
+        if rows is None:
+            rows = self._match(prefix)
+        return [
+            {
+                'id': int(self.book_ids[row]),
+                'title': self.titles[row],
+                'author': self.authors[row],
+                'num_ratings': int(self.popularity[row])
+            }
+            for row in rows[:limit].tolist()
+        ]
+
+    def stats(self):
+        """Tamaño del índice (para /cache/stats)"""
+        return {
+            'books': len(self),
+            'keys': len(self.keys),
+            'key_chars': sum(len(key) for key in self.keys),
+            'short_prefixes': len(self.short),
+        }
+
+# Índice en uso. Se sustituye entero al recargar (asignar una referencia es atómico)
+_index = None
+_reload_lock = threading.Lock()
+
+def load_index():
+    """Construyo el índice con los libros de la base de datos (necesita contexto de app)"""
+    from models import db, get_suggestion_rows
+
+    start = time.perf_counter()
+    try:
+        rows = get_suggestion_rows()
+    finally:
+        db.session.remove()
+    if rows is None:
+        return None
+    index = SuggestIndex(rows)
+    print(f"🔤 Índice de autocompletado: {len(index)} libros, {len(index.keys)} claves "
+          f"en {time.perf_counter() - start:.2f} s", flush=True)
+    return index
+
+def reload(app):
+    """Reconstruyo el índice y lo sustituyo; si falla me quedo con el anterior"""
+    global _index
+    with _reload_lock:
+        with app.app_context():
+            index = load_index()
+        if index is not None:
+            _index = index
+    return _index
+
+def suggest(q, limit=SUGGEST_LIMIT):
+    """Sugerencias para el texto q (lista vacía si el índice aún no está cargado)"""
+    index = _index
+    if index is None:
+        return []
+    limit = max(1, min(int(limit), SUGGEST_MAX_LIMIT))
+    return index.suggest(q, limit=limit)
+
+def index_stats():
+    index = _index
+    return index.stats() if index is not None else None
+
+def init_suggest(app):
+    """Construyo el índice al arrancar y lo recargo cada vez que cambie el catálogo"""
+    reload(app)
+    on_invalidate(lambda: reload(app))
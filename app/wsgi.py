@@ -0,0 +1,11 @@
+"""
+Punto de entrada WSGI para producción.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Cada proceso de gunicorn importa este módulo y crea su propia aplicación
+(su pool de conexiones y su hilo de invalidación de cachés).
+"""
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,103 @@
+"""
+Prueba de carga HTTP contra la web en marcha: peticiones por segundo y latencias.
+
+Uso:
+    # Servidor de desarrollo de Flask (un proceso)
+    (cd app && python app.py)
+    python bench/bench_http.py --url http://127.0.0.1:5000 --concurrency 16 --duration 30
+
+    # gunicorn (varios procesos e hilos)
+    (cd app && gunicorn -c gunicorn.conf.py wsgi:app)
+    python bench/bench_http.py --url http://127.0.0.1:5000 --concurrency 16 --duration 30
+
+Cada cliente (un hilo con conexión keep-alive) pide en bucle rutas de la
+mezcla: portada, búsquedas, más valorados y fichas de libros. No necesita
+dependencias fuera de la librería estándar.
+"""
+import argparse
+import http.client
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from common import print_report, write_results
+
+DEFAULT_PATHS = [
+    '/', '/top-rated', '/top-rated?page=2', '/search?q=harry', '/search?q=king',
+    '/search?q=garcia', '/search?category=eng', '/book/1', '/book/2', '/book/10', '/book/100',
+]
+
+def _connect(base):
+    return http.client.HTTPConnection(base.hostname, base.port or 80, timeout=30)
+
+def _get(conn, path):
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+def client(base, paths, deadline, timings, errors, lock, seed):
+    rng = random.Random(seed)
+    local_timings, local_errors = {}, 0
+    conn = _connect(base)
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            try:
+                status = _get(conn, path)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # El servidor cerró la conexión keep-alive: reintento con una nueva, como un navegador
+                conn.close()
+                conn = _connect(base)
+                status = _get(conn, path)
+            if status >= 500:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = _connect(base)
+            continue
+        local_timings.setdefault(path, []).append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+    with lock:
+        for path, values in local_timings.items():
+            timings.setdefault(path, []).extend(values)
+        errors[0] += local_errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16, help='clientes simultáneos')
+    parser.add_argument('--duration', type=float, default=30, help='segundos de prueba')
+    parser.add_argument('--paths', nargs='*', default=DEFAULT_PATHS)
+    parser.add_argument('--json', help='guardar los resultados en este fichero (ver bench/compare.py)')
+    args = parser.parse_args()
+
+    base = urlsplit(args.url)
+    timings, errors, lock = {}, [0], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(base, args.paths, deadline, timings, errors, lock, i))
+               for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in timings.values())
+    print(f"{args.url}: {args.concurrency} clientes, {elapsed:.1f} s")
+    print(f"  {total} peticiones ({total / elapsed:.1f} req/s), {errors[0]} errores")
+    results = {'todas': {**print_report('todas', [t for values in timings.values() for t in values]),
+                         'req_per_s': round(total / elapsed, 1), 'errors': errors[0]}}
+    for path in sorted(timings):
+        results[path] = print_report(path, timings[path])
+
+    if args.json:
+        write_results(args.json, 'http', results, http_concurrency=args.concurrency)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de la búsqueda de conjuntos frecuentes: mlxtend.apriori frente a
+los motores de app/mining.py ('pairs' y 'fpgrowth').
+
+Uso:
+    python bench/bench_mining.py --supports 0.05 0.02 0.01 0.005 --jobs 4
+    python bench/bench_mining.py --ratings database/ratings.csv
+
+Sin --ratings genero valoraciones sintéticas con cola larga (unos pocos libros
+muy leídos y muchos casi sin lectores), que es la forma del catálogo real.
+No necesita base de datos. Para cada soporte mide el tiempo de cada motor,
+cuenta los conjuntos y reglas encontrados y comprueba que coinciden con mlxtend.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import common  # noqa: F401  (añade app/ al path)
+from mining import mine_frequent_itemsets
+from recommendation import create_user_book_matrix, generate_rules
+
+def synthetic_ratings(n_ratings, n_users, n_books, seed=0):
+    """Valoraciones aleatorias con popularidad de libros tipo Zipf"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': rng.integers(1, n_users + 1, n_ratings),
+        'book_id': rng.zipf(1.3, n_ratings) % n_books + 1,
+        'rating': rng.integers(1, 6, n_ratings),
+    })
+
+def run_engine(matrix, engine, min_support, max_len, n_jobs):
+    """Ejecuto un motor y devuelvo (segundos, pico de memoria en MB del proceso principal, conjuntos)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    itemsets = mine_frequent_itemsets(matrix, min_support=min_support, max_len=max_len,
+                                      engine=engine, n_jobs=n_jobs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, itemsets
+
+def as_dict(itemsets):
+    return {items: round(support, 9) for items, support in zip(itemsets['itemsets'], itemsets['support'])}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ratings', help='CSV con user_id, book_id, rating (por defecto datos sintéticos)')
+    parser.add_argument('--n-ratings', type=int, default=300_000)
+    parser.add_argument('--n-users', type=int, default=20_000)
+    parser.add_argument('--n-books', type=int, default=5_000)
+    parser.add_argument('--supports', type=float, nargs='*', default=[0.05, 0.02, 0.01, 0.005])
+    parser.add_argument('--max-len', type=int, default=2, help='tamaño máximo de los conjuntos')
+    parser.add_argument('--jobs', type=int, default=None, help='procesos (por defecto todos los núcleos)')
+    parser.add_argument('--min-confidence', type=float, default=0.6)
+    parser.add_argument('--apriori-timeout', type=float, default=120,
+                        help='no sigo ejecutando mlxtend con soportes menores si tarda más que esto (s)')
+    args = parser.parse_args()
+
+    if args.ratings:
+        ratings = pd.read_csv(args.ratings, usecols=['user_id', 'book_id', 'rating'])
+    else:
+        ratings = synthetic_ratings(args.n_ratings, args.n_users, args.n_books)
+    matrix = create_user_book_matrix(ratings)
+    print()
+
+    engines = ['apriori', 'pairs', 'fpgrowth'] if args.max_len <= 2 else ['apriori', 'fpgrowth']
+    skip_apriori = False
+    for min_support in sorted(args.supports, reverse=True):
+        print(f"Soporte mínimo {min_support} (max_len={args.max_len}):")
+        baseline = None
+        for engine in engines:
+            if engine == 'apriori' and skip_apriori:
+                print(f"  {'apriori':<10} omitido (demasiado lento con soportes mayores)")
+                continue
+            elapsed, peak_mb, itemsets = run_engine(matrix, engine, min_support, args.max_len, args.jobs)
+            rules = generate_rules(itemsets, min_confidence=args.min_confidence) if len(itemsets) else []
+
+            if engine == 'apriori':
+                baseline = as_dict(itemsets)
+                skip_apriori = elapsed > args.apriori_timeout
+                check = ''
+            else:
+                check = '' if baseline is None else ('  = mlxtend' if as_dict(itemsets) == baseline else '  ≠ mlxtend')
+
+            print(f"  {engine:<10} {elapsed:>8.2f} s  pico={peak_mb:>8.1f} MB  "
+                  f"conjuntos={len(itemsets):<8} reglas={len(rules):<8}{check}", flush=True)
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark por etapas del sistema de recomendación (app/recommendation.py).
+
+Uso:
+    python bench/generate_data.py --scale 1 --out bench/data/x1
+    python bench/bench_recommendation.py --data-dir bench/data/x1 --json bench/results/actual.json
+
+Mide, sobre los CSV de --data-dir (por defecto database/):
+- load_data: leyendo los CSV, creando la caché .npy y abriéndola con mmap
+- create_user_book_matrix, apply_apriori (motor --engine, por defecto 'pairs'
+  como etl/train_recommendations.py), generate_rules
+- build_rule_index y las consultas get_recommendations sobre el índice
+- build_similarity_index y sus consultas
+
+No necesita base de datos. La caché de load_data va a una carpeta temporal
+para que la primera lectura sea siempre la de los CSV.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+from common import measure, print_report, write_results
+
+def timed(results, name, fn):
+    """Ejecuto una etapa una vez, la guardo en results y devuelvo su resultado"""
+    start = time.perf_counter()
+    value = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    results[name] = print_report(name, [elapsed])
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=None, help='carpeta con los CSV (por defecto database/)')
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--min-confidence', type=float, default=0.2)
+    parser.add_argument('--max-len', type=int, default=2, help='tamaño máximo de los conjuntos (como el entrenamiento)')
+    parser.add_argument('--engine', default='pairs', choices=['fpgrowth', 'pairs', 'apriori'])
+    parser.add_argument('--jobs', type=int, default=None, help='procesos (por defecto todos los núcleos)')
+    parser.add_argument('--lookups', type=int, default=1000, help='consultas get_recommendations medidas')
+    parser.add_argument('--json', help='guardar los resultados en este fichero (ver bench/compare.py)')
+    args = parser.parse_args()
+
+    # recommendation.py lee las rutas al importarse
+    if args.data_dir:
+        os.environ['RECOMMENDATION_DATA_DIR'] = os.path.abspath(args.data_dir)
+    os.environ['RECOMMENDATION_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench-recommendation-')
+    import recommendation as rec
+
+    print(f"Recomendación sobre {rec.DATA_DIR} (motor {args.engine}, soporte {args.min_support}):")
+    results = {}
+
+    ratings, books, _ = timed(results, 'load_data (CSV)', lambda: rec.load_data(use_cache=False))
+    if ratings is None:
+        sys.exit(1)
+    timed(results, 'load_data (crear caché)', rec.load_data)
+    ratings, books, _ = timed(results, 'load_data (mmap)', rec.load_data)
+
+    matrix = timed(results, 'create_user_book_matrix', lambda: rec.create_user_book_matrix(ratings))
+    itemsets = timed(results, f'apply_apriori ({args.engine})',
+                     lambda: rec.apply_apriori(matrix, min_support=args.min_support,
+                                               max_len=args.max_len, engine=args.engine,
+                                               n_jobs=args.jobs))
+    rules = timed(results, 'generate_rules', lambda: rec.generate_rules(itemsets, min_confidence=args.min_confidence))
+    rule_index = timed(results, 'build_rule_index', lambda: rec.build_rule_index(rules, books))
+    similarity_index = timed(results, 'build_similarity_index',
+                             lambda: rec.build_similarity_index(matrix, books, n_jobs=args.jobs))
+
+    # Consultas por título: mezcla de libros con y sin reglas (sin los avisos de "no hay recomendaciones")
+    titles = itertools.cycle(books['title'].sample(min(len(books), 500), random_state=0).tolist())
+    for name, index in [('get_recommendations (reglas)', rule_index),
+                        ('get_recommendations (similitud)', similarity_index)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = measure(lambda: rec.get_recommendations(next(titles), books, index), repeat=args.lookups)
+        results[name] = print_report(name, timings)
+
+    print(f"  {len(ratings)} valoraciones, {len(itemsets)} conjuntos frecuentes, {len(rules)} reglas")
+    if args.json:
+        write_results(args.json, 'recommendation', results,
+                      recommendation_data=os.path.basename(os.path.normpath(rec.DATA_DIR)),
+                      n_ratings=len(ratings))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark de la similitud libro-libro (app/item_similarity.py) según el
+tamaño del catálogo.
+
+Uso:
+    python bench/bench_similarity.py --books 1000 2500 5000 10000 --jobs 1 4
+    python bench/bench_similarity.py --metric jaccard --block-size 512
+
+Genero valoraciones sintéticas con cola larga (unos pocos libros muy leídos
+y muchos casi sin lectores) con un número de valoraciones proporcional al de
+libros, y mido el tiempo para calcular los K vecinos de todos los libros,
+los libros por segundo y la memoria aproximada de cada bloque.
+No necesita base de datos.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import common  # noqa: F401  (añade app/ al path)
+from item_similarity import item_similarity_index
+from recommendation import create_user_book_matrix
+
+def synthetic_ratings(n_books, ratings_per_book, users_per_book, seed=0):
+    """Valoraciones aleatorias con popularidad de libros tipo Zipf"""
+    rng = np.random.default_rng(seed)
+    n_ratings = n_books * ratings_per_book
+    return pd.DataFrame({
+        'user_id': rng.integers(1, n_books * users_per_book + 1, n_ratings),
+        'book_id': rng.zipf(1.3, n_ratings) % n_books + 1,
+        'rating': rng.integers(1, 6, n_ratings),
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, nargs='*', default=[1000, 2500, 5000, 10000])
+    parser.add_argument('--ratings-per-book', type=int, default=600, help='valoraciones generadas por libro')
+    parser.add_argument('--users-per-book', type=int, default=5, help='usuarios generados por libro')
+    parser.add_argument('--jobs', type=int, nargs='*', default=[1, 4], help='procesos a comparar')
+    parser.add_argument('--metric', default='cosine', choices=['cosine', 'jaccard'])
+    parser.add_argument('--top-n', type=int, default=20)
+    parser.add_argument('--block-size', type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"Similitud {args.metric}, top {args.top_n}, bloques de {args.block_size} libros:")
+    for n_books in args.books:
+        matrix = create_user_book_matrix(synthetic_ratings(n_books, args.ratings_per_book, args.users_per_book))
+        block_mb = matrix.shape[1] * args.block_size * 4 * 4 / 1024 / 1024
+        for n_jobs in args.jobs:
+            start = time.perf_counter()
+            index = item_similarity_index(matrix, top_n=args.top_n, metric=args.metric,
+                                          block_size=args.block_size, n_jobs=n_jobs)
+            elapsed = time.perf_counter() - start
+            print(f"  libros={matrix.shape[1]:<7} procesos={n_jobs:<3} {elapsed:>8.2f} s  "
+                  f"{matrix.shape[1] / elapsed:>10.0f} libros/s  "
+                  f"bloque≈{block_mb:>6.1f} MB/proceso  con vecinos={len(index)}", flush=True)
+
+if __name__ == '__main__':
+    main()
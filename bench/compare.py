@@ -0,0 +1,72 @@
+"""
+Comparo unos resultados de benchmark con la línea base y marco las regresiones.
+
+Uso:
+    python bench/compare.py bench/results/baseline.json bench/results/actual.json
+    python bench/compare.py baseline.json actual.json --threshold 0.15
+
+Los ficheros son los que escriben los benchmarks con --json (ver
+common.write_results). Comparo p50 y p99 (menos es mejor) y las peticiones
+por segundo de bench_http (más es mejor). Una medida es una regresión si
+empeora más que --threshold (por defecto 25%) y más de --min-delta-ms
+(para no alarmarse por 0.1 ms que pasan a 0.2 ms).
+
+Sale con código 1 si hay alguna regresión, para poder usarlo en CI.
+"""
+import argparse
+import json
+import sys
+
+# Medidas comparadas y si un valor mayor es peor
+METRICS = {'p50_ms': True, 'p99_ms': True, 'req_per_s': False}
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Devuelvo una fila por medida común: (suite, caso, medida, antes, ahora, cambio, regresión)"""
+    rows = []
+    for suite, cases in sorted(current.get('suites', {}).items()):
+        base_cases = baseline.get('suites', {}).get(suite, {})
+        for name, values in sorted(cases.items()):
+            base_values = base_cases.get(name)
+            if not base_values:
+                continue
+            for metric, higher_is_worse in METRICS.items():
+                before, after = base_values.get(metric), values.get(metric)
+                if before is None or after is None or before == 0:
+                    continue
+                change = (after - before) / before
+                worse = change if higher_is_worse else -change
+                regression = worse > threshold
+                if regression and metric.endswith('_ms') and abs(after - before) < min_delta_ms:
+                    regression = False
+                rows.append((suite, name, metric, before, after, change, regression))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.25, help='empeoramiento relativo tolerado')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='diferencia absoluta mínima en ms')
+    parser.add_argument('--all', action='store_true', help='mostrar también lo que no ha empeorado')
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    print(f"Línea base: {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')})")
+    print(f"Actual:     {current['meta'].get('commit')} ({current['meta'].get('created_at')})")
+
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    regressions = [row for row in rows if row[-1]]
+    for suite, name, metric, before, after, change, regression in rows:
+        if regression or args.all:
+            mark = '❌' if regression else '  '
+            print(f"{mark} {suite:<15} {name:<40} {metric:<10} {before:>10.3f} -> {after:>10.3f} ({change:+.0%})")
+
+    print(f"{len(rows)} medidas comparadas, {len(regressions)} regresiones (umbral {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
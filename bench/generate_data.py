@@ -0,0 +1,195 @@
+"""
+Generador de datos sintéticos con el formato de los CSV de database/.
+
+Produce books.csv, copies(ejemplares).csv, user_info.csv y ratings.csv con las
+mismas columnas que los reales, listos para etl/load_csv.py y para
+app/recommendation.py. La escala 1 reproduce el tamaño documentado en
+schema.sql (unas 6M valoraciones de 53k usuarios sobre 10k libros y 55k
+ejemplares); --scale 10 o 100 multiplica usuarios y valoraciones.
+
+La forma imita el catálogo real:
+- Popularidad de libros con cola larga (Zipf): unos pocos libros acumulan
+  muchas valoraciones y la mayoría casi ninguna.
+- Actividad de usuarios log-normal: la mayoría valora pocos libros.
+- Cada libro tiene su "calidad" (media propia), así que mv_top_rated_books
+  tiene un orden estable y no es ruido.
+- Un usuario valora cada ejemplar una vez como mucho (unique_user_copy).
+
+Uso:
+    python bench/generate_data.py --scale 1 --out bench/data/x1
+    python bench/generate_data.py --scale 10 --out bench/data/x10 --seed 7
+    python etl/load_csv.py --data-dir bench/data/x1 --reset
+
+Con la misma semilla y escala los ficheros salen idénticos.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Tamaños a escala 1 (los de los comentarios de database/schema.sql)
+BASE_BOOKS = 10_000
+BASE_COPIES = 55_327
+BASE_USERS = 53_424
+BASE_USER_INFO = 501
+BASE_RATINGS = 5_976_479
+
+# Forma de las distribuciones
+BOOK_ZIPF_EXPONENT = 0.9         # popularidad de libros: p(rango r) ~ 1 / (r + 10) ^ exponente
+USER_ACTIVITY_SIGMA = 1.0        # dispersión (log-normal) del número de valoraciones por usuario
+USERS_PER_BLOCK = 20_000         # usuarios generados y escritos a la vez
+
+TITLE_WORDS = (
+    "harry potter la casa del sol noche amor guerra paz canción hielo fuego niño árbol "
+    "ciudad perdida tiempo señor anillos historia mundo love war king game hunger night "
+    "shadow girl secret garden soledad cien años river house dark stories"
+).split()
+AUTHOR_FIRST = ['Isabel', 'Gabriel', 'Stephen', 'J.K.', 'Benito', 'Suzanne', 'George', 'Jane',
+                'Carlos', 'Laura', 'Mario', 'Agatha', 'Haruki', 'Toni', 'Julio', 'Ana']
+AUTHOR_LAST = ['Allende', 'García Márquez', 'King', 'Rowling', 'Pérez Galdós', 'Collins', 'Orwell',
+               'Austen', 'Ruiz Zafón', 'Esquivel', 'Vargas Llosa', 'Christie', 'Murakami', 'Morrison',
+               'Cortázar', 'Matute']
+# Idiomas con proporciones parecidas a las del catálogo (None = vacío, 10.8%)
+LANGUAGES = ['eng', 'en-US', 'en-GB', 'spa', 'fre', 'ger', 'ita', None]
+LANGUAGE_WEIGHTS = [0.62, 0.12, 0.05, 0.04, 0.03, 0.02, 0.012, 0.108]
+SEXES = ['Mujer', 'Hombre', 'Prefiere no responder']
+
+def _sizes(scale, catalog_scale):
+    return {
+        'books': int(BASE_BOOKS * catalog_scale),
+        'copies': int(BASE_COPIES * catalog_scale),
+        'users': int(BASE_USERS * scale),
+        'user_info': int(BASE_USER_INFO * scale),
+        'ratings': int(BASE_RATINGS * scale),
+    }
+
+def write_books(path, n_books, rng):
+    """Libros con huecos como los reales (isbn 7%, original_title 5.9%, año 0.2%)"""
+    words = np.asarray(TITLE_WORDS)
+    lengths = rng.integers(1, 5, n_books)
+    picks = rng.integers(0, len(words), (n_books, 4))
+    titles = [' '.join(words[row[:n]]).title() for row, n in zip(picks, lengths)]
+
+    # Unos pocos autores con muchos libros (Zipf) y muchos con uno solo
+    n_authors = max(1, n_books // 4)
+    author_ids = (rng.zipf(1.6, n_books) - 1) % n_authors
+    authors = [f"{AUTHOR_FIRST[a % len(AUTHOR_FIRST)]} {AUTHOR_LAST[(a // len(AUTHOR_FIRST)) % len(AUTHOR_LAST)]}"
+               + (f" {a // (len(AUTHOR_FIRST) * len(AUTHOR_LAST))}" if a >= len(AUTHOR_FIRST) * len(AUTHOR_LAST) else '')
+               for a in author_ids.tolist()]
+
+    book_ids = np.arange(1, n_books + 1)
+    years = rng.integers(1850, 2018, n_books).astype(float)
+    years[rng.random(n_books) < 0.002] = np.nan
+    isbn = (100_000_000 + book_ids).astype(str).astype(object)
+    isbn[rng.random(n_books) < 0.07] = None
+    original_titles = np.asarray(titles, dtype=object)
+    original_titles[rng.random(n_books) < 0.059] = None
+    languages = rng.choice(len(LANGUAGES), n_books, p=LANGUAGE_WEIGHTS)
+
+    pd.DataFrame({
+        'isbn': isbn,
+        'authors': authors,
+        'original_publication_year': years,
+        'original_title': original_titles,
+        'title': titles,
+        'language_code': [LANGUAGES[i] for i in languages.tolist()],
+        'book_id': book_ids,
+        'image_url': [f"https://images.example.org/books/{i}.jpg" for i in book_ids.tolist()],
+    }).to_csv(path, index=False)
+
+def write_copies(path, n_books, n_copies, popularity, rng):
+    """
+    Ejemplares: todos los libros tienen al menos uno y el resto se reparten
+    según la popularidad. Devuelvo (primer copy_id, nº de ejemplares) por libro.
+    """
+    extra = rng.multinomial(max(0, n_copies - n_books), popularity)
+    per_book = 1 + extra
+    book_of_copy = np.repeat(np.arange(1, n_books + 1), per_book)
+    pd.DataFrame({
+        'copy_id': np.arange(1, len(book_of_copy) + 1),
+        'book_id': book_of_copy,
+    }).to_csv(path, index=False)
+    first_copy = np.concatenate(([1], 1 + np.cumsum(per_book)[:-1]))
+    return first_copy, per_book
+
+def write_user_info(path, n_user_info, n_users, rng):
+    """Datos personales de una pequeña parte de los usuarios (1% en el real)"""
+    user_ids = np.sort(rng.choice(n_users, min(n_user_info, n_users), replace=False) + 1)
+    n = len(user_ids)
+    days, months, years = rng.integers(1, 29, n), rng.integers(1, 13, n), rng.integers(1940, 2006, n)
+    pd.DataFrame({
+        'user_id': user_ids,
+        'sexo': [SEXES[i] for i in rng.choice(len(SEXES), n, p=[0.5, 0.45, 0.05]).tolist()],
+        'comentario': [f"Le gustan los libros de {TITLE_WORDS[i]}" for i in rng.integers(0, len(TITLE_WORDS), n).tolist()],
+        'fecha_nacimiento': [f"{d:02d}/{m:02d}/{y}" for d, m, y in zip(days.tolist(), months.tolist(), years.tolist())],
+    }).to_csv(path, index=False)
+
+def write_ratings(path, n_users, n_ratings, popularity, quality, first_copy, copies_per_book, rng):
+    """
+    Valoraciones por bloques de usuarios (no caben en memoria a escala 100).
+    Para cada usuario elijo libros según su popularidad, un ejemplar de cada
+    uno y una nota alrededor de la calidad del libro. Devuelvo las filas escritas.
+    """
+    # Valoraciones por usuario: log-normal con la media que da n_ratings en total
+    activity = rng.lognormal(0, USER_ACTIVITY_SIGMA, n_users)
+    per_user = np.maximum(1, np.round(activity / activity.sum() * n_ratings)).astype(np.int64)
+    cumulative = np.cumsum(popularity)
+    cumulative[-1] = 1.0
+
+    written = 0
+    with open(path, 'w', newline='') as f:
+        f.write('user_id,copy_id,rating\n')
+        for start in range(0, n_users, USERS_PER_BLOCK):
+            counts = per_user[start:start + USERS_PER_BLOCK]
+            users = np.repeat(np.arange(start + 1, start + 1 + len(counts)), counts)
+            books = np.searchsorted(cumulative, rng.random(len(users)), side='right')
+            copies = first_copy[books] + (rng.random(len(users)) * copies_per_book[books]).astype(np.int64)
+
+            # Un usuario no repite ejemplar (unique_user_copy)
+            n_copies = int(first_copy[-1] + copies_per_book[-1])
+            _, first = np.unique(users * n_copies + copies, return_index=True)
+            first.sort()
+            users, books, copies = users[first], books[first], copies[first]
+
+            ratings = np.clip(np.rint(quality[books] + rng.normal(0, 0.9, len(users))), 1, 5).astype(np.int8)
+            pd.DataFrame({'user_id': users, 'copy_id': copies, 'rating': ratings}).to_csv(
+                f, index=False, header=False)
+            written += len(users)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1, help='multiplica usuarios y valoraciones (1 = ~6M)')
+    parser.add_argument('--catalog-scale', type=float, default=1, help='multiplica libros y ejemplares (1 = 10k libros)')
+    parser.add_argument('--out', default=None, help='carpeta de salida (por defecto bench/data/x<scale>)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', f"x{args.scale:g}")
+    os.makedirs(out, exist_ok=True)
+    sizes = _sizes(args.scale, args.catalog_scale)
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+
+    # Popularidad por libro (los ids se barajan para que no coincida con el orden)
+    ranks = rng.permutation(sizes['books'])
+    popularity = 1.0 / (ranks + 10.0) ** BOOK_ZIPF_EXPONENT
+    popularity /= popularity.sum()
+    quality = np.clip(rng.normal(3.9, 0.35, sizes['books']), 1.5, 4.9)
+
+    write_books(os.path.join(out, 'books.csv'), sizes['books'], rng)
+    first_copy, copies_per_book = write_copies(os.path.join(out, 'copies(ejemplares).csv'),
+                                               sizes['books'], sizes['copies'], popularity, rng)
+    write_user_info(os.path.join(out, 'user_info.csv'), sizes['user_info'], sizes['users'], rng)
+    print(f"✅ {sizes['books']} libros, {int(copies_per_book.sum())} ejemplares, "
+          f"{sizes['user_info']} fichas de usuario", flush=True)
+
+    n_ratings = write_ratings(os.path.join(out, 'ratings.csv'), sizes['users'], sizes['ratings'],
+                              popularity, quality, first_copy, copies_per_book, rng)
+    print(f"✅ {n_ratings} valoraciones de {sizes['users']} usuarios en {out} "
+          f"({time.perf_counter() - start:.1f} s)", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Ejecuto la batería de benchmarks completa y la comparo con la línea base.
+
+Uso (con la base de datos cargada con los mismos CSV, ver readme "Benchmarks"):
+    python bench/run_suite.py --data-dir bench/data/x1 --url http://127.0.0.1:5000 \\
+        --baseline bench/results/baseline.json
+
+    # primera vez: guardar el resultado como línea base
+    python bench/run_suite.py --data-dir bench/data/x1 --url http://127.0.0.1:5000 \\
+        --out bench/results/baseline.json
+
+Pasos (todos escriben en el mismo JSON, --out):
+  1. bench_models.py: funciones de models.py contra DATABASE_URL
+  2. bench_recommendation.py: etapas de recommendation.py sobre --data-dir
+  3. bench_http.py: carga HTTP contra --url (solo si se indica)
+  4. compare.py contra --baseline (solo si se indica); sale con 1 si hay regresiones
+"""
+import argparse
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+def run(script, *args):
+    command = [sys.executable, os.path.join(BENCH_DIR, script), *[str(arg) for arg in args]]
+    print(f"\n▶️  {' '.join(command[1:])}", flush=True)
+    return subprocess.run(command).returncode
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', help='CSV para bench_recommendation.py (los mismos que se cargaron en la BD)')
+    parser.add_argument('--url', help='web en marcha para bench_http.py (sin --url no hay prueba HTTP)')
+    parser.add_argument('--out', help='fichero de resultados (por defecto bench/results/<fecha>.json)')
+    parser.add_argument('--baseline', help='línea base con la que comparar')
+    parser.add_argument('--threshold', type=float, default=0.25, help='empeoramiento tolerado (ver compare.py)')
+    parser.add_argument('--repeat', type=int, default=100, help='repeticiones por caso de bench_models.py')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--skip', nargs='*', default=[], choices=['models', 'recommendation', 'http'])
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+
+    failed = []
+    if 'models' not in args.skip and run('bench_models.py', '--repeat', args.repeat, '--json', out):
+        failed.append('models')
+    if 'recommendation' not in args.skip:
+        extra = ['--data-dir', args.data_dir] if args.data_dir else []
+        if run('bench_recommendation.py', *extra, '--json', out):
+            failed.append('recommendation')
+    if 'http' not in args.skip and args.url:
+        if run('bench_http.py', '--url', args.url, '--concurrency', args.concurrency,
+               '--duration', args.duration, '--json', out):
+            failed.append('http')
+
+    print(f"\n💾 Resultados en {out}")
+    if failed:
+        print(f"❌ Fallaron: {', '.join(failed)}")
+        sys.exit(2)
+    if args.baseline:
+        sys.exit(run('compare.py', args.baseline, out, '--threshold', args.threshold))
+
+if __name__ == '__main__':
+    main()
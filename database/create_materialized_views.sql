@@ -1,27 +1,36 @@
 -- Script para crear las vistas materializadas
--- Ejecutar SOLO LA PRIMERA VEZ o si se borra la base de datos
+-- Ejecutar la primera vez, si se borra la base de datos o tras la migración 005
 
 -- Borra la vista si ya existe (para recrearla)
 DROP MATERIALIZED VIEW IF EXISTS mv_top_rated_books CASCADE;
 
 -- Crea la vista materializada de libros más valorados
--- Esto tarda ~30-40 segundos pero solo se ejecuta una vez
+-- Se calcula sobre book_rating_stats (un resumen por libro que mantienen los
+-- triggers de ratings, migración 005), así que tarda milisegundos en vez de
+-- recorrer los ~6M de valoraciones
 CREATE MATERIALIZED VIEW mv_top_rated_books AS
 SELECT 
     b.book_id, 
     b.title, 
     b.authors, 
-    AVG(r.rating) as avg_rating,
-    COUNT(r.rating) as num_ratings
-FROM books b
-JOIN copies c ON b.book_id = c.book_id
-JOIN ratings r ON c.copy_id = r.copy_id
-GROUP BY b.book_id, b.title, b.authors
-HAVING COUNT(r.rating) > 10
+    s.avg_rating,
+    s.rating_count::bigint as num_ratings
+FROM book_rating_stats s
+JOIN books b ON b.book_id = s.book_id
+WHERE s.rating_count > 10
 ORDER BY avg_rating DESC, num_ratings DESC;
 
--- Crea índice para optimizar consultas
-CREATE INDEX idx_mv_top_rated_avg ON mv_top_rated_books(avg_rating DESC, num_ratings DESC);
+-- Índice único: necesario para REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_mv_top_rated_book_id ON mv_top_rated_books(book_id);
+
+-- Crea índice para optimizar consultas (y la paginación por clave de /top-rated)
+CREATE INDEX idx_mv_top_rated_keyset ON mv_top_rated_books(avg_rating DESC, num_ratings DESC, book_id DESC);
+
+-- El total de /top-rated se estima con las estadísticas de la vista
+ANALYZE mv_top_rated_books;
+
+-- Avisa a la web para que vacíe sus cachés del catálogo (migración 004)
+SELECT bump_catalog_version();
 
 -- Muestra estadísticas
 SELECT 
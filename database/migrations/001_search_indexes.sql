@@ -0,0 +1,45 @@
+-- Migración 001: búsqueda por texto indexada (pg_trgm + tsvector)
+-- Ejecutar una vez sobre una base de datos creada con schema.sql:
+--   docker exec -i casa-cultura-db psql -U library_user -d library < database/migrations/001_search_indexes.sql
+--
+-- Antes, /search?q= hacía "title ILIKE '%q%' OR authors ILIKE '%q%'", que no
+-- puede usar los índices btree idx_books_title/idx_books_authors y acababa
+-- siempre en un seq scan de books. Aquí añadimos:
+--   * search_text: título + autores normalizados (minúsculas y sin acentos),
+--     indexado con GIN trigram para las búsquedas por subcadena.
+--   * search_vector: tsvector con el título en español e inglés (con stemming)
+--     y los autores sin stemming, indexado con GIN para la búsqueda por palabras
+--     y el ranking por relevancia.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE, así que no se puede usar en columnas generadas ni en
+-- índices. Este envoltorio fija el diccionario y permite marcarlo IMMUTABLE.
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+-- Normalización común para la columna y para el texto buscado
+CREATE OR REPLACE FUNCTION f_normalize_search(text)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT lower(public.f_unaccent($1)) $$;
+
+ALTER TABLE books
+    ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (f_normalize_search(title || ' ' || authors)) STORED;
+
+ALTER TABLE books
+    ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', f_unaccent(title)), 'A') ||
+        setweight(to_tsvector('english', f_unaccent(title)), 'A') ||
+        setweight(to_tsvector('simple', f_unaccent(authors)), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_books_search_trgm ON books USING GIN (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_search_vector ON books USING GIN (search_vector);
+
+ANALYZE books;
@@ -0,0 +1,22 @@
+-- Migración 002: índices para la paginación por clave (keyset)
+--
+-- Los listados ya no usan LIMIT/OFFSET: cada página se pide a partir de la
+-- clave de la última fila vista. /, /search y /top-rated ordenan así:
+--   * books: book_id (clave primaria, ya indexada)
+--   * mv_top_rated_books: (avg_rating, num_ratings, book_id) descendente
+-- El índice antiguo de la vista no incluía book_id, que es el que desempata.
+
+-- Si la vista aún no existe, create_materialized_views.sql ya crea este índice
+DO $$
+BEGIN
+    IF to_regclass('mv_top_rated_books') IS NOT NULL THEN
+        DROP INDEX IF EXISTS idx_mv_top_rated_avg;
+        CREATE INDEX IF NOT EXISTS idx_mv_top_rated_keyset
+            ON mv_top_rated_books(avg_rating DESC, num_ratings DESC, book_id DESC);
+        ANALYZE mv_top_rated_books;
+    END IF;
+END
+$$;
+
+-- Los totales salen de pg_class.reltuples: me aseguro de que están al día
+ANALYZE books;
@@ -0,0 +1,10 @@
+-- Migración 003: índice compuesto para /search?category=
+--
+-- El filtro por idioma ahora se hace en SQL y pagina por book_id, así que
+-- (language_code, book_id) sirve tanto el WHERE como el ORDER BY y el conteo
+-- (index-only scan). El índice simple sobre language_code queda redundante.
+
+CREATE INDEX IF NOT EXISTS idx_books_language_book ON books(language_code, book_id);
+DROP INDEX IF EXISTS idx_books_language;
+
+ANALYZE books;
@@ -0,0 +1,33 @@
+-- Migración 004: versión del catálogo e invalidación de cachés
+--
+-- La web guarda en memoria las lecturas del catálogo (app/cache.py). Cada vez
+-- que el catálogo cambia (ETL, refresco de vistas) hay que llamar a
+--   SELECT bump_catalog_version();
+-- que incrementa la versión y avisa por NOTIFY catalog_changed a todos los
+-- procesos de la web para que vacíen sus cachés.
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),     -- Una única fila
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO catalog_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE catalog_version
+    SET version = version + 1, updated_at = now()
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('catalog_changed', new_version::text);
+    RETURN new_version;
+END;
+$$;
+
+COMMENT ON TABLE catalog_version IS 'Versión del catálogo. bump_catalog_version() la incrementa y avisa a la web (NOTIFY catalog_changed).';
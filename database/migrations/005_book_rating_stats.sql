@@ -0,0 +1,144 @@
+-- Migración 005: resumen de valoraciones por libro mantenido de forma incremental
+--
+-- Antes, mv_top_rated_books se calculaba con el join completo
+-- books-copies-ratings (~6M filas, 30-40 s) y cada REFRESH bloqueaba a los
+-- lectores de /top-rated. Ahora:
+--   * book_rating_stats guarda suma, número y media de valoraciones por libro
+--   * unos triggers de sentencia sobre ratings aplican solo el delta de cada
+--     INSERT/UPDATE/DELETE (un COPY de miles de filas es una única actualización)
+--   * la vista se calcula sobre book_rating_stats (10k filas) y tiene un índice
+--     único, así que se puede refrescar con REFRESH ... CONCURRENTLY
+--
+-- Después de aplicar esta migración hay que volver a ejecutar
+-- create_materialized_views.sql para recrear la vista sobre la nueva tabla.
+
+CREATE TABLE IF NOT EXISTS book_rating_stats (
+    book_id INTEGER PRIMARY KEY,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    avg_rating NUMERIC GENERATED ALWAYS AS (
+        CASE WHEN rating_count > 0 THEN rating_sum::numeric / rating_count END
+    ) STORED,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    CONSTRAINT fk_book_rating_stats_book
+        FOREIGN KEY (book_id)
+        REFERENCES books(book_id)
+        ON DELETE CASCADE
+);
+
+-- El job de refresco (etl/refresh_views.py) mira si ha cambiado algo desde la última vez
+CREATE INDEX IF NOT EXISTS idx_book_rating_stats_updated_at ON book_rating_stats(updated_at);
+
+COMMENT ON TABLE book_rating_stats IS 'Resumen de valoraciones por libro. Lo mantienen los triggers de ratings; rebuild_book_rating_stats() lo recalcula entero.';
+
+-- Recalcula el resumen completo (tras una carga masiva con los triggers desactivados)
+CREATE OR REPLACE FUNCTION rebuild_book_rating_stats()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    total BIGINT;
+BEGIN
+    TRUNCATE book_rating_stats;
+
+    INSERT INTO book_rating_stats (book_id, rating_sum, rating_count)
+    SELECT c.book_id, SUM(r.rating), COUNT(*)
+    FROM ratings r
+    JOIN copies c ON c.copy_id = r.copy_id
+    GROUP BY c.book_id;
+
+    GET DIAGNOSTICS total = ROW_COUNT;
+    RETURN total;
+END;
+$$;
+
+-- Aplica un conjunto de deltas (book_id, suma, número) al resumen. Ordeno por
+-- book_id para que dos sentencias concurrentes bloqueen las filas en el mismo orden.
+CREATE OR REPLACE FUNCTION ratings_stats_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO book_rating_stats AS s (book_id, rating_sum, rating_count)
+    SELECT c.book_id, SUM(n.rating), COUNT(*)
+    FROM new_rows n
+    JOIN copies c ON c.copy_id = n.copy_id
+    GROUP BY c.book_id
+    ORDER BY c.book_id
+    ON CONFLICT (book_id) DO UPDATE
+    SET rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        rating_count = s.rating_count + EXCLUDED.rating_count,
+        updated_at = now();
+    RETURN NULL;
+END;
+$$;
+
+-- NOTA: si se borra un ejemplar, sus valoraciones se borran en cascada cuando
+-- el ejemplar ya no existe y no se puede saber su libro. En ese caso (poco
+-- habitual) hay que ejecutar SELECT rebuild_book_rating_stats();
+CREATE OR REPLACE FUNCTION ratings_stats_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE book_rating_stats AS s
+    SET rating_sum = s.rating_sum - d.rating_sum,
+        rating_count = s.rating_count - d.rating_count,
+        updated_at = now()
+    FROM (
+        SELECT c.book_id, SUM(o.rating) AS rating_sum, COUNT(*) AS rating_count
+        FROM old_rows o
+        JOIN copies c ON c.copy_id = o.copy_id
+        GROUP BY c.book_id
+        ORDER BY c.book_id
+    ) d
+    WHERE s.book_id = d.book_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ratings_stats_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO book_rating_stats AS s (book_id, rating_sum, rating_count)
+    SELECT c.book_id, SUM(d.rating), SUM(d.delta_count)
+    FROM (
+        SELECT copy_id, rating, 1 AS delta_count FROM new_rows
+        UNION ALL
+        SELECT copy_id, -rating, -1 AS delta_count FROM old_rows
+    ) d
+    JOIN copies c ON c.copy_id = d.copy_id
+    GROUP BY c.book_id
+    ORDER BY c.book_id
+    ON CONFLICT (book_id) DO UPDATE
+    SET rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        rating_count = s.rating_count + EXCLUDED.rating_count,
+        updated_at = now();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_ratings_stats_insert ON ratings;
+CREATE TRIGGER trg_ratings_stats_insert
+    AFTER INSERT ON ratings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_insert();
+
+DROP TRIGGER IF EXISTS trg_ratings_stats_delete ON ratings;
+CREATE TRIGGER trg_ratings_stats_delete
+    AFTER DELETE ON ratings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_delete();
+
+DROP TRIGGER IF EXISTS trg_ratings_stats_update ON ratings;
+CREATE TRIGGER trg_ratings_stats_update
+    AFTER UPDATE ON ratings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_update();
+
+-- Carga inicial del resumen con las valoraciones existentes
+SELECT rebuild_book_rating_stats() AS libros_con_valoraciones;
+ANALYZE book_rating_stats;
@@ -0,0 +1,20 @@
+-- Migración 006: recomendaciones precalculadas por libro
+--
+-- etl/train_recommendations.py entrena reglas de asociación con las
+-- valoraciones (rating >= 4) y guarda aquí las K mejores recomendaciones de
+-- cada libro. La ficha de un libro las lee con un rango de la clave primaria
+-- (book_id, rank), sin recorrer books.
+--
+-- El entrenamiento escribe en book_recommendations_new y la intercambia con
+-- esta tabla en una sola transacción, así que la web nunca ve una tabla a medias.
+
+CREATE TABLE IF NOT EXISTS book_recommendations (
+    book_id INTEGER NOT NULL,                       -- Libro consultado
+    rank SMALLINT NOT NULL,                         -- 1 = mejor recomendación
+    recommended_book_id INTEGER NOT NULL,           -- Libro recomendado
+    confidence REAL NOT NULL,                       -- P(recomendado | libro) entre usuarios con rating >= 4
+    lift REAL NOT NULL,                             -- confidence / soporte del recomendado
+    CONSTRAINT book_recommendations_pkey PRIMARY KEY (book_id, rank)
+);
+
+COMMENT ON TABLE book_recommendations IS 'Top-K recomendaciones por libro (reglas de asociación). La reemplaza etl/train_recommendations.py.';
@@ -0,0 +1,43 @@
+-- Migración 007: cuentas persistentes para actualizar las recomendaciones de forma incremental
+--
+-- etl/train_recommendations.py guarda, además de book_recommendations, cuántos
+-- usuarios valoran bien (rating >= 4) cada libro y cada pareja de libros.
+-- Con --incremental suma a estas cuentas solo las valoraciones con id mayor que
+-- rec_state.last_rating_id y recalcula las recomendaciones de los libros afectados.
+--
+-- rec_pair_counts solo guarda las parejas con al menos --pair-count-margin (la
+-- mitad por defecto) de los usuarios que exige el soporte mínimo. Con todas
+-- las parejas (cualquier coincidencia) eran decenas de millones de filas con el
+-- catálogo completo, reescritas en cada entrenamiento completo, casi todas muy
+-- lejos de llegar al soporte.
+
+CREATE TABLE IF NOT EXISTS rec_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),     -- Una única fila
+    last_rating_id BIGINT NOT NULL,                     -- Última valoración incluida en las cuentas
+    n_users INTEGER NOT NULL,                           -- Usuarios con alguna valoración positiva
+    min_support DOUBLE PRECISION NOT NULL,              -- Parámetros del último entrenamiento completo
+    min_confidence DOUBLE PRECISION NOT NULL,
+    top_k INTEGER NOT NULL,
+    trained_at TIMESTAMPTZ NOT NULL DEFAULT now(),      -- Último entrenamiento completo
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()       -- Última actualización incremental
+);
+
+CREATE TABLE IF NOT EXISTS rec_item_counts (
+    book_id INTEGER NOT NULL,
+    user_count INTEGER NOT NULL,                        -- Usuarios que valoran bien el libro
+    CONSTRAINT rec_item_counts_pkey PRIMARY KEY (book_id)
+);
+
+CREATE TABLE IF NOT EXISTS rec_pair_counts (
+    book_a INTEGER NOT NULL,
+    book_b INTEGER NOT NULL,
+    user_count INTEGER NOT NULL,                        -- Usuarios que valoran bien los dos libros
+    CONSTRAINT rec_pair_counts_pkey PRIMARY KEY (book_a, book_b),
+    CONSTRAINT rec_pair_counts_order CHECK (book_a < book_b)
+);
+
+-- Las parejas de un libro se buscan por los dos lados
+CREATE INDEX IF NOT EXISTS idx_rec_pair_counts_book_b ON rec_pair_counts (book_b);
+
+COMMENT ON TABLE rec_state IS 'Marca de agua y parámetros de las recomendaciones (etl/train_recommendations.py).';
+COMMENT ON TABLE rec_pair_counts IS 'Usuarios en común por pareja de libros (book_a < book_b), con rating >= 4.';
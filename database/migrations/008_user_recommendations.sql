@@ -0,0 +1,18 @@
+-- Migración 008: recomendaciones personalizadas por usuario
+--
+-- etl/train_user_recommendations.py puntúa los libros que cada usuario no ha
+-- valorado a partir de los que sí le gustaron (rating >= 4) y guarda aquí los
+-- N mejores. /user/<id>/recommendations los lee con un rango de la clave primaria.
+--
+-- Igual que book_recommendations, el trabajo carga user_recommendations_new y
+-- la intercambia con esta tabla en una sola transacción.
+
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    user_id INTEGER NOT NULL,
+    rank SMALLINT NOT NULL,                         -- 1 = mejor recomendación
+    book_id INTEGER NOT NULL,                       -- Libro recomendado (no valorado por el usuario)
+    score REAL NOT NULL,                            -- Suma de similitudes/confianzas con sus libros
+    CONSTRAINT user_recommendations_pkey PRIMARY KEY (user_id, rank)
+);
+
+COMMENT ON TABLE user_recommendations IS 'Top-N libros recomendados por usuario. La reemplaza etl/train_user_recommendations.py.';
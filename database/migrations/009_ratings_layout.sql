@@ -0,0 +1,141 @@
+-- Migración 009: ratings particionada por hash y con índice de cobertura
+--
+-- Todos los agregados de valoraciones (rebuild_book_rating_stats, los
+-- triggers de book_rating_stats, v_book_ratings) cruzan ratings con copies por
+-- copy_id y solo necesitan rating. Con el esquema original leían las filas
+-- completas del heap, y los índices de una columna apenas ayudaban:
+--   * idx_ratings_rating: solo 5 valores distintos, el planner no lo usa
+--   * idx_ratings_created_at: ninguna consulta filtra por fecha
+--   * idx_ratings_user_id: lo cubre unique_user_copy (user_id, copy_id)
+--   * idx_ratings_copy_id: lo sustituye idx_ratings_copy_rating
+-- y cada uno era un índice más que mantener en cada INSERT.
+--
+-- Ahora:
+--   * ratings está particionada por HASH (copy_id) en 8 particiones: las
+--     valoraciones de un ejemplar están todas en la misma (una consulta por
+--     copy_id solo mira esa partición), cada partición tiene índices más
+--     pequeños y VACUUM/ANALYZE trabajan por partes
+--   * idx_ratings_copy_rating (copy_id) INCLUDE (rating) permite agregar por
+--     ejemplar con index-only scans, sin leer el heap
+--   * la clave primaria pasa a ser (id, copy_id): en una tabla particionada
+--     debe incluir la clave de partición. id sigue saliendo de ratings_id_seq y
+--     el índice de la PK sirve para max(id) y para id > marca del entrenamiento
+--     incremental (etl/train_recommendations.py --incremental)
+--
+-- Se copia la tabla entera dentro de una transacción. Mientras se copia, la
+-- web sigue leyendo la tabla antigua pero las escrituras en ratings esperan
+-- (mejor parar antes el ETL y etl/train_recommendations.py --interval).
+-- Después hay que volver a ejecutar
+-- create_materialized_views.sql (no depende de ratings, pero así se refrescan
+-- las estadísticas y se avisa a la web). Medidas antes/después:
+-- bench/bench_ratings_layout.py.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'ratings'::regclass) = 'p' THEN
+        RAISE EXCEPTION 'ratings ya está particionada (migración 009 ya aplicada)';
+    END IF;
+END;
+$$;
+
+-- Nadie escribe en ratings mientras la copio (las lecturas siguen)
+LOCK TABLE ratings IN SHARE MODE;
+
+-- Las vistas dependen de ratings: se recrean al final
+DROP VIEW IF EXISTS v_ratings_with_books;
+DROP VIEW IF EXISTS v_book_ratings;
+
+CREATE TABLE ratings_new (
+    id INTEGER NOT NULL DEFAULT nextval('ratings_id_seq'),
+    user_id INTEGER NOT NULL,
+    copy_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT ratings_rating_check CHECK (rating >= 1 AND rating <= 5)
+) PARTITION BY HASH (copy_id);
+
+CREATE TABLE ratings_p0 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 0);
+CREATE TABLE ratings_p1 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 1);
+CREATE TABLE ratings_p2 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 2);
+CREATE TABLE ratings_p3 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 3);
+CREATE TABLE ratings_p4 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 4);
+CREATE TABLE ratings_p5 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 5);
+CREATE TABLE ratings_p6 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 6);
+CREATE TABLE ratings_p7 PARTITION OF ratings_new FOR VALUES WITH (MODULUS 8, REMAINDER 7);
+
+-- Copio las filas antes de crear los índices (es más rápido construirlos al final)
+INSERT INTO ratings_new (id, user_id, copy_id, rating, created_at)
+SELECT id, user_id, copy_id, rating, created_at FROM ratings;
+
+-- La secuencia pasa a la tabla nueva para que no se borre con la antigua
+ALTER SEQUENCE ratings_id_seq OWNED BY ratings_new.id;
+
+-- Borra también sus índices, restricciones y triggers
+DROP TABLE ratings;
+ALTER TABLE ratings_new RENAME TO ratings;
+
+ALTER TABLE ratings ADD CONSTRAINT ratings_pkey PRIMARY KEY (id, copy_id);
+ALTER TABLE ratings ADD CONSTRAINT unique_user_copy UNIQUE (user_id, copy_id);
+ALTER TABLE ratings ADD CONSTRAINT fk_ratings_copy
+    FOREIGN KEY (copy_id) REFERENCES copies(copy_id) ON DELETE CASCADE;
+
+-- Agregados por ejemplar/libro sin leer el heap
+CREATE INDEX idx_ratings_copy_rating ON ratings (copy_id) INCLUDE (rating);
+
+COMMENT ON TABLE ratings IS 'Valoraciones de usuarios sobre ejemplares. Particionada por HASH (copy_id) en 8 particiones (migración 009).';
+COMMENT ON COLUMN ratings.user_id IS 'ADVERTENCIA: La mayoría de user_ids (99.1%) no tienen registro en la tabla users. No hay FK para permitir carga de datos.';
+
+-- Triggers de book_rating_stats (migración 005): de sentencia y sobre la tabla
+-- particionada, así que ven en new_rows/old_rows las filas de todas las particiones
+CREATE TRIGGER trg_ratings_stats_insert
+    AFTER INSERT ON ratings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_insert();
+
+CREATE TRIGGER trg_ratings_stats_delete
+    AFTER DELETE ON ratings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_delete();
+
+CREATE TRIGGER trg_ratings_stats_update
+    AFTER UPDATE ON ratings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ratings_stats_update();
+
+CREATE VIEW v_ratings_with_books AS
+SELECT
+    r.id,
+    r.user_id,
+    r.copy_id,
+    r.rating,
+    r.created_at,
+    c.book_id,
+    b.title,
+    b.authors,
+    b.isbn
+FROM ratings r
+JOIN copies c ON r.copy_id = c.copy_id
+JOIN books b ON c.book_id = b.book_id;
+
+-- Igual que en schema.sql, pero contando rating en vez de DISTINCT r.id (da lo
+-- mismo: cada valoración sale una vez) para que baste con idx_ratings_copy_rating
+CREATE VIEW v_book_ratings AS
+SELECT
+    b.book_id,
+    b.title,
+    b.authors,
+    COUNT(r.rating) as total_ratings,
+    AVG(r.rating) as avg_rating,
+    MIN(r.rating) as min_rating,
+    MAX(r.rating) as max_rating
+FROM books b
+LEFT JOIN copies c ON b.book_id = c.book_id
+LEFT JOIN ratings r ON c.copy_id = r.copy_id
+GROUP BY b.book_id, b.title, b.authors;
+
+COMMIT;
+
+-- Fuera de la transacción: marca las páginas como visibles para los index-only scans
+VACUUM ANALYZE ratings;
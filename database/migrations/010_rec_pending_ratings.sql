@@ -0,0 +1,16 @@
+-- Migración 010: valoraciones pendientes por debajo de la marca de agua
+--
+-- El modo incremental de etl/train_recommendations.py lee las valoraciones con
+-- id mayor que rec_state.last_rating_id. Los id salen de ratings_id_seq al
+-- insertar, no al confirmar: una transacción que tomó el id 100 y confirma
+-- después de que el entrenamiento haya leído max(id) = 120 quedaba por debajo
+-- de la marca y no se contaba hasta el siguiente entrenamiento completo.
+--
+-- Ahora cada entrenamiento lee en una sola instantánea (REPEATABLE READ) y
+-- guarda aquí los id del tramo leído que todavía no veía (transacciones en
+-- curso o deshechas). La siguiente vuelta incremental cuenta los que ya se
+-- ven y olvida los que quedan más de PENDING_ID_WINDOW id por detrás de la marca.
+
+ALTER TABLE rec_state ADD COLUMN IF NOT EXISTS pending_rating_ids INTEGER[] NOT NULL DEFAULT '{}';
+
+COMMENT ON COLUMN rec_state.pending_rating_ids IS 'Id por debajo de last_rating_id que no eran visibles al leer (etl/train_recommendations.py).';
@@ -1,8 +1,16 @@
 -- Script para refrescar las vistas materializadas
--- Ejecutar cuando se añadan nuevas valoraciones o libros
+-- Las valoraciones nuevas ya están en book_rating_stats (triggers de la
+-- migración 005); esto solo recalcula la clasificación. Para hacerlo de forma
+-- periódica y solo cuando haya cambios: python etl/refresh_views.py --interval 10
 
--- Refresca la vista de libros más valorados
-REFRESH MATERIALIZED VIEW mv_top_rated_books;
+-- Refresca la vista de libros más valorados sin bloquear a los lectores
+REFRESH MATERIALIZED VIEW CONCURRENTLY mv_top_rated_books;
+
+-- Actualiza las estadísticas (el total de /top-rated se estima con ellas)
+ANALYZE mv_top_rated_books;
+
+-- Avisa a la web para que vacíe sus cachés del catálogo (migración 004)
+SELECT bump_catalog_version();
 
 -- Muestra estadísticas actualizadas
 SELECT 
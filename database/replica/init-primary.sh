@@ -0,0 +1,11 @@
+#!/bin/bash
+# Preparo el primario para la réplica de docker-compose.replica.yml: usuario de
+# replicación y permiso en pg_hba.conf. Lo ejecuta el entrypoint de postgres
+# (docker-entrypoint-initdb.d) solo al crear el volumen de datos.
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-SQL
+    CREATE ROLE ${REPLICATION_USER:-replicator} WITH REPLICATION LOGIN PASSWORD '${REPLICATION_PASSWORD:-replicator_pass}';
+SQL
+
+echo "host replication ${REPLICATION_USER:-replicator} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,52 @@
+"""
+Refresco de la clasificación de libros más valorados.
+
+Las valoraciones nuevas se suman al momento a book_rating_stats (triggers de
+la migración 005). Este script recalcula mv_top_rated_books con
+REFRESH MATERIALIZED VIEW CONCURRENTLY (sin bloquear a los lectores) solo
+cuando el resumen ha cambiado, y avisa a la web para que vacíe sus cachés.
+
+Uso:
+    python etl/refresh_views.py                 # una vez
+    python etl/refresh_views.py --interval 10   # cada 10 s mientras haya cambios
+"""
+import argparse
+import time
+
+from common import connect
+
+def last_stats_change(cur):
+    cur.execute("SELECT max(updated_at) FROM book_rating_stats")
+    return cur.fetchone()[0]
+
+def refresh(cur):
+    """Refresco la vista y aviso a la web. Devuelvo la nueva versión del catálogo"""
+    start = time.perf_counter()
+    cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_top_rated_books")
+    cur.execute("ANALYZE mv_top_rated_books")
+    cur.execute("SELECT bump_catalog_version()")
+    version = cur.fetchone()[0]
+    print(f"✅ mv_top_rated_books refrescada en {time.perf_counter() - start:.2f} s "
+          f"(catálogo versión {version})", flush=True)
+    return version
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interval', type=float, default=0,
+                        help='segundos entre comprobaciones (0 = refrescar una vez y salir)')
+    args = parser.parse_args()
+    
+    conn = connect(autocommit=True)
+    with conn.cursor() as cur:
+        last_seen = last_stats_change(cur)
+        refresh(cur)
+        
+        while args.interval > 0:
+            time.sleep(args.interval)
+            changed_at = last_stats_change(cur)
+            if changed_at != last_seen:
+                last_seen = changed_at
+                refresh(cur)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,552 @@
+"""
+Entrenamiento de las recomendaciones por libro.
+
+Entrenamiento completo: leo las valoraciones positivas (rating >= 4) de
+ratings + copies, busco las parejas de libros que suelen gustar a los mismos
+usuarios (app/mining.py), genero las reglas {A} -> {B} y guardo las K mejores
+de cada libro en book_recommendations (migración 006). También guardo cuántos
+usuarios valoran bien cada libro y cada pareja (migración 007) y hasta qué
+valoración he leído (rec_state.last_rating_id).
+
+Las tablas nuevas se cargan con COPY en <tabla>_new y se intercambian con las
+actuales en una sola transacción. Al terminar aviso a la web
+(bump_catalog_version) para que vacíe sus cachés.
+
+Modo incremental (--incremental): sumo a las cuentas solo las valoraciones con
+id mayor que la marca de agua y recalculo en SQL las recomendaciones de los
+libros afectados: los valorados, los que ya gustaban a sus usuarios y los que
+recomiendan alguno de los valorados (su lift usa la cuenta del recomendado).
+El coste depende de las valoraciones nuevas (y del historial de sus usuarios),
+no de todo ratings. Hasta el siguiente entrenamiento completo quedan sin
+corregir:
+- los cambios y borrados de valoraciones antiguas;
+- con usuarios nuevos, el lift y el soporte mínimo (los dos dependen del total
+  de usuarios) de los libros que no se recalculan: el lift se queda un poco
+  alto y el soporte un poco bajo, en la proporción de usuarios nuevos.
+
+rec_pair_counts no guarda todas las parejas (con todo el catálogo son decenas
+de millones de filas), solo las que tienen al menos --pair-count-margin (la
+mitad por defecto) de los usuarios que exige --min-support. Una pareja que no
+se guardó empieza en 0 en el modo incremental: le faltan como mucho tantos
+usuarios como ese mínimo, así que puede tardar más en alcanzar el soporte
+hasta el siguiente entrenamiento completo, que la cuenta entera.
+
+Los id de ratings se reparten al insertar, no al confirmar: al leer la marca
+puede haber id más bajos aún sin confirmar. Cada entrenamiento lee en una sola
+instantánea y guarda en rec_state.pending_rating_ids (migración 010) los id del
+tramo leído que no veía; la siguiente vuelta incremental los cuenta si ya se
+ven. Los que siguen sin verse a PENDING_ID_WINDOW id de la marca se olvidan
+(transacciones deshechas o valoraciones borradas).
+
+Con --model-dir (o RECOMMENDATION_MODEL_DIR), después de cada entrenamiento
+publico también book_recommendations como artefacto para la web
+(app/model_service.py): un RuleIndex guardado en una carpeta nueva, que la web
+carga memory-mapped sin leer la tabla.
+
+Uso:
+    python etl/train_recommendations.py
+    python etl/train_recommendations.py --model-dir /srv/models/recommendations
+    python etl/train_recommendations.py --min-support 0.001 --min-confidence 0.05 --top-k 20
+    python etl/train_recommendations.py --incremental               # una vez
+    python etl/train_recommendations.py --incremental --interval 60 # cada minuto
+"""
+import argparse
+import io
+import math
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from common import connect
+from mining import iter_pair_counts, mine_frequent_itemsets
+from model_service import publish
+from recommendation import build_rule_index, create_user_book_matrix, generate_rules
+from rule_index import RuleIndex
+
+# Un solo entrenamiento (completo, incremental o por usuario) a la vez. Es un
+# bloqueo de sesión: se toma y se suelta en cada ejecución (training_lock), no
+# se queda tomado mientras --interval espera a la siguiente
+TRAINING_LOCK_KEY = "hashtext('train_recommendations')"
+
+POSITIVE_RATINGS_SQL = """
+    COPY (
+        SELECT r.user_id, c.book_id, r.rating
+        FROM ratings r
+        JOIN copies c ON c.copy_id = r.copy_id
+        WHERE r.rating >= 4
+        AND r.id <= %(last_rating_id)s
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+# Los id pendientes que quedan más atrás se dan por perdidos (ROLLBACK o borrados)
+PENDING_ID_WINDOW = 100_000
+
+# Id del tramo [from_id, to_id] que no se ven en la instantánea actual
+MISSING_IDS_SQL = """
+    SELECT COALESCE(array_agg(g.id ORDER BY g.id), '{}')
+    FROM generate_series(%(from_id)s, %(to_id)s) AS g(id)
+    WHERE NOT EXISTS (SELECT 1 FROM ratings r WHERE r.id = g.id)
+"""
+
+# Tablas que publica el entrenamiento completo: clave primaria e índices
+# (se crean después del COPY, que así es mucho más rápido)
+PUBLISHED_TABLES = {
+    'book_recommendations': {'primary_key': '(book_id, rank)', 'indexes': {}},
+    'rec_item_counts': {'primary_key': '(book_id)', 'indexes': {}},
+    'rec_pair_counts': {'primary_key': '(book_a, book_b)',
+                        'indexes': {'idx_rec_pair_counts_book_b': '(book_b)'}},
+}
+
+@contextmanager
+def training_lock(conn, wait=True):
+    """
+    Tomo el bloqueo de entrenamiento durante el bloque with y lo suelto al salir.
+    Con wait=True espero a que quede libre; con wait=False devuelvo False sin
+    esperar si otro entrenamiento lo tiene (y el bloque debe saltarse su trabajo)
+    """
+    with conn.cursor() as cur:
+        if wait:
+            cur.execute(f"SELECT pg_advisory_lock({TRAINING_LOCK_KEY})")
+            acquired = True
+        else:
+            cur.execute(f"SELECT pg_try_advisory_lock({TRAINING_LOCK_KEY})")
+            acquired = cur.fetchone()[0]
+    conn.commit()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT pg_advisory_unlock({TRAINING_LOCK_KEY})")
+                conn.commit()
+            except psycopg2.Error:
+                # Conexión perdida: PostgreSQL ya ha soltado el bloqueo con la sesión
+                pass
+
+# ============================================================================
+# Entrenamiento completo
+# ============================================================================
+
+def last_rating_id(cur):
+    cur.execute("SELECT COALESCE(max(id), 0) FROM ratings")
+    return cur.fetchone()[0]
+
+def start_snapshot(cur):
+    """
+    Todo lo que lea la transacción de cur sale de la misma instantánea: la marca,
+    las valoraciones y los id que faltan (debe ser su primera sentencia)
+    """
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+def pending_ids(cur, up_to_id, after_id=0, previous=()):
+    """
+    Id que quedan pendientes con la marca en up_to_id: los de previous que
+    siguen sin verse y los que faltan en (after_id, up_to_id], sin pasar de
+    PENDING_ID_WINDOW id por detrás de la marca
+    """
+    floor = up_to_id - PENDING_ID_WINDOW
+    cur.execute(MISSING_IDS_SQL, {'from_id': max(after_id, floor) + 1, 'to_id': up_to_id})
+    missing = cur.fetchone()[0]
+    if previous:
+        cur.execute("SELECT array_agg(id) FROM ratings WHERE id = ANY(%(ids)s::integer[])", {'ids': list(previous)})
+        visible = set(cur.fetchone()[0] or ())
+        missing = [i for i in previous if i > floor and i not in visible] + missing
+    return missing
+
+def load_positive_ratings(conn, up_to_id):
+    """Valoraciones positivas por libro (las de ejemplar se traducen con copies)"""
+    buffer = io.StringIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(cur.mogrify(POSITIVE_RATINGS_SQL, {'last_rating_id': up_to_id}).decode(), buffer)
+    buffer.seek(0)
+    ratings = pd.read_csv(buffer, dtype={'user_id': np.int32, 'book_id': np.int32, 'rating': np.int8})
+    print(f"✅ {len(ratings)} valoraciones positivas leídas (hasta id {up_to_id})", flush=True)
+    return ratings
+
+def _csv_buffer(columns):
+    buffer = io.StringIO()
+    pd.DataFrame(columns).to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return buffer
+
+def recommendation_rows(index):
+    """Filas (book_id, rank, recommended_book_id, confidence, lift) del índice de reglas, en CSV"""
+    counts = np.diff(index.indptr)
+    return _csv_buffer({
+        'book_id': np.repeat(index.book_ids, counts),
+        'rank': np.arange(len(index.rec_ids)) - np.repeat(index.indptr[:-1], counts) + 1,
+        'recommended_book_id': index.rec_ids,
+        'confidence': index.confidence,
+        'lift': index.lift,
+    })
+
+def prepare_table(cur, table):
+    """Creo <tabla>_new vacía y sin índices, con las mismas columnas que la tabla publicada"""
+    cur.execute(f"DROP TABLE IF EXISTS {table}_new")
+    cur.execute(f"CREATE TABLE {table}_new (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+
+def copy_rows(cur, table, buffer):
+    cur.copy_expert(f"COPY {table}_new FROM STDIN WITH (FORMAT csv)", buffer)
+
+def finish_table(cur, table, tables=PUBLISHED_TABLES):
+    """Clave primaria, índices y estadísticas de <tabla>_new una vez cargada"""
+    spec = tables[table]
+    cur.execute(f"ALTER TABLE {table}_new ADD CONSTRAINT {table}_new_pkey PRIMARY KEY {spec['primary_key']}")
+    for name, columns in spec['indexes'].items():
+        cur.execute(f"CREATE INDEX {name}_new ON {table}_new {columns}")
+    cur.execute(f"ANALYZE {table}_new")
+
+def swap_tables(cur, tables=PUBLISHED_TABLES):
+    """Cambio las tablas publicadas por sus versiones _new (dentro de la transacción de quien llama)"""
+    # Si la web está leyendo las tablas, no espero indefinidamente el bloqueo
+    cur.execute("SET LOCAL lock_timeout = '10s'")
+    for table, spec in tables.items():
+        cur.execute(f"DROP TABLE {table}")
+        cur.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        cur.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_new_pkey TO {table}_pkey")
+        for name in spec['indexes']:
+            cur.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+
+def pair_count_floor(min_support, n_users, margin):
+    """
+    Usuarios en común mínimos para guardar una pareja en rec_pair_counts: una
+    fracción (margin) de la cuenta que exige min_support, con el mismo
+    redondeo que mining._min_count. Con margin=0 se guardan todas
+    """
+    min_count = max(1, math.ceil(min_support * n_users - 1e-9))
+    return max(1, math.floor(min_count * margin))
+
+def save_counts(cur, matrix, n_jobs, min_pair_count=1):
+    """
+    Cargo rec_item_counts (todos los libros) y rec_pair_counts (las parejas
+    con al menos min_pair_count usuarios en común)
+    """
+    item_counts = np.diff(matrix.csc.indptr)
+    copy_rows(cur, 'rec_item_counts', _csv_buffer({'book_id': matrix.book_ids, 'user_count': item_counts}))
+
+    n_pairs = 0
+    for rows, cols, counts in iter_pair_counts(matrix, min_count=min_pair_count, n_jobs=n_jobs):
+        # Las columnas de la matriz están ordenadas por book_id, así que book_a < book_b
+        copy_rows(cur, 'rec_pair_counts', _csv_buffer({
+            'book_a': matrix.book_ids[rows],
+            'book_b': matrix.book_ids[cols],
+            'user_count': counts,
+        }))
+        n_pairs += len(counts)
+    return n_pairs
+
+def train_full(conn, args):
+    """Entrenamiento completo. Devuelvo la nueva versión del catálogo"""
+    with conn.cursor() as cur:
+        start_snapshot(cur)
+        up_to_id = last_rating_id(cur)
+        pending = pending_ids(cur, up_to_id)
+    ratings = load_positive_ratings(conn, up_to_id)
+    conn.commit()
+
+    matrix = create_user_book_matrix(ratings)
+    del ratings
+    itemsets = mine_frequent_itemsets(matrix, min_support=args.min_support, max_len=2,
+                                      engine=args.engine, n_jobs=args.jobs)
+    print(f"Se encontraron {len(itemsets)} conjuntos frecuentes", flush=True)
+    rules = generate_rules(itemsets, min_confidence=args.min_confidence)
+    index = build_rule_index(rules, None, top_n=args.top_k)
+
+    with conn.cursor() as cur:
+        for table in PUBLISHED_TABLES:
+            prepare_table(cur, table)
+        copy_rows(cur, 'book_recommendations', recommendation_rows(index))
+        min_pair_count = pair_count_floor(args.min_support, matrix.shape[0], args.pair_count_margin)
+        n_pairs = save_counts(cur, matrix, args.jobs, min_pair_count)
+        for table in PUBLISHED_TABLES:
+            finish_table(cur, table)
+    conn.commit()
+    print(f"✅ Cuentas guardadas: {matrix.shape[1]} libros, {n_pairs} parejas "
+          f"(con {min_pair_count} usuarios en común o más)", flush=True)
+
+    with conn.cursor() as cur:
+        swap_tables(cur)
+        cur.execute("""
+            INSERT INTO rec_state (id, last_rating_id, pending_rating_ids, n_users, min_support, min_confidence, top_k)
+            VALUES (TRUE, %(last_rating_id)s, %(pending)s::integer[], %(n_users)s, %(min_support)s,
+                    %(min_confidence)s, %(top_k)s)
+            ON CONFLICT (id) DO UPDATE SET
+                last_rating_id = EXCLUDED.last_rating_id,
+                pending_rating_ids = EXCLUDED.pending_rating_ids,
+                n_users = EXCLUDED.n_users,
+                min_support = EXCLUDED.min_support,
+                min_confidence = EXCLUDED.min_confidence,
+                top_k = EXCLUDED.top_k,
+                trained_at = now(),
+                updated_at = now()
+        """, {
+            'last_rating_id': up_to_id,
+            'pending': pending,
+            'n_users': int(matrix.shape[0]),
+            'min_support': args.min_support,
+            'min_confidence': args.min_confidence,
+            'top_k': args.top_k,
+        })
+        cur.execute("SELECT bump_catalog_version()")
+        version = cur.fetchone()[0]
+    conn.commit()
+
+    print(f"✅ book_recommendations publicada: {len(index.rec_ids)} recomendaciones de {len(index)} libros "
+          f"(catálogo versión {version})", flush=True)
+    return version
+
+# ============================================================================
+# Artefacto para la web
+# ============================================================================
+
+PUBLISHED_RECOMMENDATIONS_SQL = """
+    COPY (
+        SELECT book_id, recommended_book_id, confidence, lift
+        FROM book_recommendations
+        ORDER BY book_id, rank
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+def export_model(conn, model_dir, catalog_version):
+    """
+    Publico book_recommendations tal y como ha quedado (tras el entrenamiento
+    completo o el incremental) como versión nueva del modelo de la web
+    """
+    start = time.perf_counter()
+    buffer = io.StringIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(PUBLISHED_RECOMMENDATIONS_SQL, buffer)
+    conn.commit()
+    buffer.seek(0)
+    rows = pd.read_csv(buffer, dtype={'book_id': np.int64, 'recommended_book_id': np.int64,
+                                      'confidence': np.float64, 'lift': np.float64})
+
+    # Las filas vienen ordenadas por libro y rango: ya están en formato CSR
+    book_ids, counts = np.unique(rows['book_id'].to_numpy(), return_counts=True)
+    indptr = np.zeros(len(book_ids) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    index = RuleIndex(book_ids, indptr, rows['recommended_book_id'].to_numpy(),
+                      rows['confidence'].to_numpy(), rows['lift'].to_numpy())
+
+    version = publish(index, model_dir, catalog_version)
+    print(f"✅ Modelo {version} publicado en {model_dir}: {len(index)} libros, "
+          f"{index.nbytes / 1024 ** 2:.1f} MB en {time.perf_counter() - start:.2f} s", flush=True)
+    return version
+
+# ============================================================================
+# Actualización incremental
+# ============================================================================
+
+# Valoraciones positivas nuevas (usuario, libro), incluidas las pendientes que
+# ya se ven, y libros que esos usuarios ya valoraban bien antes de la marca de agua
+DELTA_SQL = """
+    CREATE TEMP TABLE rec_delta ON COMMIT DROP AS
+    SELECT DISTINCT r.user_id, c.book_id
+    FROM ratings r
+    JOIN copies c ON c.copy_id = r.copy_id
+    WHERE ((r.id > %(last_id)s AND r.id <= %(new_id)s) OR r.id = ANY(%(pending)s::integer[]))
+    AND r.rating >= 4;
+
+    CREATE TEMP TABLE rec_known ON COMMIT DROP AS
+    SELECT DISTINCT r.user_id, c.book_id
+    FROM ratings r
+    JOIN copies c ON c.copy_id = r.copy_id
+    WHERE r.user_id IN (SELECT DISTINCT user_id FROM rec_delta)
+    AND r.id <= %(last_id)s
+    AND r.id <> ALL(%(pending)s::integer[])
+    AND r.rating >= 4;
+
+    -- Un libro que el usuario ya valoraba bien (otro ejemplar) no cuenta dos veces
+    DELETE FROM rec_delta d
+    USING rec_known k
+    WHERE k.user_id = d.user_id AND k.book_id = d.book_id;
+"""
+
+NEW_USERS_SQL = """
+    SELECT count(DISTINCT d.user_id)
+    FROM rec_delta d
+    WHERE NOT EXISTS (SELECT 1 FROM rec_known k WHERE k.user_id = d.user_id)
+"""
+
+UPDATE_COUNTS_SQL = """
+    INSERT INTO rec_item_counts (book_id, user_count)
+    SELECT book_id, count(*) FROM rec_delta GROUP BY book_id
+    ON CONFLICT (book_id) DO UPDATE
+    SET user_count = rec_item_counts.user_count + EXCLUDED.user_count;
+
+    -- Parejas libro nuevo x libro que ya le gustaba al usuario
+    INSERT INTO rec_pair_counts (book_a, book_b, user_count)
+    SELECT least(d.book_id, k.book_id), greatest(d.book_id, k.book_id), count(*)
+    FROM rec_delta d
+    JOIN rec_known k ON k.user_id = d.user_id
+    GROUP BY 1, 2
+    ON CONFLICT (book_a, book_b) DO UPDATE
+    SET user_count = rec_pair_counts.user_count + EXCLUDED.user_count;
+
+    -- Parejas de dos libros nuevos del mismo usuario (cada una una vez)
+    INSERT INTO rec_pair_counts (book_a, book_b, user_count)
+    SELECT d1.book_id, d2.book_id, count(*)
+    FROM rec_delta d1
+    JOIN rec_delta d2 ON d2.user_id = d1.user_id AND d2.book_id > d1.book_id
+    GROUP BY 1, 2
+    ON CONFLICT (book_a, book_b) DO UPDATE
+    SET user_count = rec_pair_counts.user_count + EXCLUDED.user_count;
+
+    -- Cambia la confianza de los libros nuevos (su cuenta) y de sus parejas,
+    -- y el lift de los libros que ya recomiendan un libro nuevo (usa su cuenta)
+    CREATE TEMP TABLE rec_affected ON COMMIT DROP AS
+    SELECT book_id FROM rec_delta
+    UNION
+    SELECT k.book_id FROM rec_known k WHERE k.user_id IN (SELECT user_id FROM rec_delta)
+    UNION
+    SELECT r.book_id FROM book_recommendations r
+    WHERE r.recommended_book_id IN (SELECT book_id FROM rec_delta);
+"""
+
+# Mismas reglas que el entrenamiento completo:
+# confianza(A -> B) = parejas(A, B) / cuenta(A), lift = confianza * usuarios / cuenta(B)
+RECOMPUTE_SQL = """
+    DELETE FROM book_recommendations
+    WHERE book_id IN (SELECT book_id FROM rec_affected);
+
+    INSERT INTO book_recommendations (book_id, rank, recommended_book_id, confidence, lift)
+    SELECT book_id, rank, recommended_book_id, confidence, lift
+    FROM (
+        SELECT
+            scored.*,
+            row_number() OVER (
+                PARTITION BY book_id
+                ORDER BY confidence DESC, lift DESC, recommended_book_id
+            ) AS rank
+        FROM (
+            SELECT
+                p.book_id,
+                p.other AS recommended_book_id,
+                p.user_count::float8 / ia.user_count AS confidence,
+                p.user_count::float8 * %(n_users)s / (ia.user_count::float8 * ib.user_count) AS lift
+            FROM (
+                SELECT book_a AS book_id, book_b AS other, user_count
+                FROM rec_pair_counts WHERE book_a IN (SELECT book_id FROM rec_affected)
+                UNION ALL
+                SELECT book_b, book_a, user_count
+                FROM rec_pair_counts WHERE book_b IN (SELECT book_id FROM rec_affected)
+            ) p
+            JOIN rec_item_counts ia ON ia.book_id = p.book_id
+            JOIN rec_item_counts ib ON ib.book_id = p.other
+            WHERE p.user_count >= %(min_count)s
+        ) scored
+        WHERE confidence >= %(min_confidence)s
+    ) ranked
+    WHERE rank <= %(top_k)s;
+"""
+
+def train_incremental(conn):
+    """
+    Sumo las valoraciones nuevas a las cuentas y recalculo los libros afectados.
+    Devuelvo la nueva versión del catálogo o None si no había nada nuevo.
+    """
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        start_snapshot(cur)
+        cur.execute("""
+            SELECT last_rating_id, pending_rating_ids, n_users, min_support, min_confidence, top_k
+            FROM rec_state FOR UPDATE
+        """)
+        state = cur.fetchone()
+        if state is None:
+            raise RuntimeError("No hay entrenamiento previo: ejecuta primero el entrenamiento completo")
+        last_id, pending, n_users, min_support, min_confidence, top_k = state
+
+        new_id = max(last_rating_id(cur), last_id)
+        still_pending = pending_ids(cur, new_id, last_id, pending)
+        if new_id == last_id and still_pending == pending:
+            conn.commit()
+            return None
+
+        cur.execute(DELTA_SQL, {'last_id': last_id, 'new_id': new_id, 'pending': pending})
+        cur.execute(NEW_USERS_SQL)
+        n_users += cur.fetchone()[0]
+        cur.execute(UPDATE_COUNTS_SQL)
+        cur.execute("SELECT count(*) FROM rec_affected")
+        n_affected = cur.fetchone()[0]
+
+        # Mismo redondeo que mining._min_count
+        min_count = max(1, math.ceil(min_support * n_users - 1e-9))
+        cur.execute(RECOMPUTE_SQL, {
+            'n_users': n_users,
+            'min_count': min_count,
+            'min_confidence': min_confidence,
+            'top_k': top_k,
+        })
+        cur.execute("""
+            UPDATE rec_state
+            SET last_rating_id = %(new_id)s, pending_rating_ids = %(pending)s::integer[],
+                n_users = %(n_users)s, updated_at = now()
+        """, {'new_id': new_id, 'pending': still_pending, 'n_users': n_users})
+        cur.execute("SELECT bump_catalog_version()")
+        version = cur.fetchone()[0]
+    conn.commit()
+
+    # Pendientes que ya se ven (o que se dan por perdidos)
+    resolved = len(set(pending) - set(still_pending))
+    new_range = f"{last_id + 1}..{new_id}" if new_id > last_id else "ninguna nueva"
+    print(f"✅ Valoraciones {new_range} y {resolved} pendientes resueltas: "
+          f"{n_affected} libros recalculados, {len(still_pending)} id pendientes "
+          f"en {time.perf_counter() - start:.2f} s (catálogo versión {version})", flush=True)
+    return version
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-support', type=float, default=0.001,
+                        help='fracción mínima de usuarios que valoran bien la pareja de libros')
+    parser.add_argument('--min-confidence', type=float, default=0.05)
+    parser.add_argument('--top-k', type=int, default=20, help='recomendaciones guardadas por libro')
+    parser.add_argument('--engine', default='pairs', help="motor de mining.py ('pairs' o 'fpgrowth')")
+    parser.add_argument('--jobs', type=int, default=None, help='procesos (por defecto todos los núcleos)')
+    parser.add_argument('--pair-count-margin', type=float, default=0.5,
+                        help='guardar en rec_pair_counts las parejas con al menos esta fracción de la cuenta '
+                             'mínima de --min-support (0 = todas)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='sumar solo las valoraciones nuevas (usa los parámetros del último entrenamiento)')
+    parser.add_argument('--interval', type=float, default=0,
+                        help='con --incremental, segundos entre actualizaciones (0 = una vez y salir)')
+    parser.add_argument('--model-dir', default=os.getenv('RECOMMENDATION_MODEL_DIR') or None,
+                        help='publicar también el modelo para la web en esta carpeta (ver app/model_service.py)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = connect()
+    try:
+        if not args.incremental:
+            with training_lock(conn):
+                version = train_full(conn, args)
+                if args.model_dir:
+                    export_model(conn, args.model_dir, version)
+            print(f"Entrenamiento completo en {time.perf_counter() - start:.1f} s", flush=True)
+            return
+
+        while True:
+            # Si hay otro entrenamiento en marcha (el completo de cada noche) me salto esta vuelta
+            with training_lock(conn, wait=args.interval <= 0) as acquired:
+                if acquired:
+                    version = train_incremental(conn)
+                    if version is None:
+                        print("Sin valoraciones nuevas desde el último entrenamiento", flush=True)
+                    elif args.model_dir:
+                        export_model(conn, args.model_dir, version)
+                else:
+                    print("Otro entrenamiento en marcha: espero a la siguiente vuelta", flush=True)
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Recomendaciones personalizadas por usuario.
+
+Para cada usuario puntúo los libros que no ha valorado sumando lo parecido
+que es cada uno a los libros que le gustaron (rating >= 4):
+
+    puntuación(u, b) = suma de S[a, b] para cada libro a que le gustó a u
+
+S son los vecinos de cada libro: la similitud libro-libro de
+app/item_similarity.py (--source similarity, cubre todo el catálogo) o las
+reglas ya entrenadas en book_recommendations (--source rules).
+
+Los usuarios se reparten por bloques entre varios procesos. Los N mejores de
+cada usuario se cargan con COPY en user_recommendations_new (migración 008),
+que se intercambia con la tabla actual en una sola transacción.
+
+Uso:
+    python etl/train_user_recommendations.py
+    python etl/train_user_recommendations.py --source rules --top-n 20 --jobs 4
+"""
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from common import connect
+from item_similarity import item_similarity_index
+from recommendation import UserBookMatrix
+from train_recommendations import copy_rows, finish_table, prepare_table, swap_tables, training_lock
+
+USER_TABLES = {
+    'user_recommendations': {'primary_key': '(user_id, rank)', 'indexes': {}},
+}
+
+ALL_RATINGS_SQL = """
+    COPY (
+        SELECT r.user_id, c.book_id, r.rating
+        FROM ratings r
+        JOIN copies c ON c.copy_id = r.copy_id
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+RULES_SQL = """
+    SELECT book_id, recommended_book_id, confidence
+    FROM book_recommendations
+"""
+
+def load_ratings(conn):
+    """Todas las valoraciones por libro: las positivas puntúan y todas cuentan como leídas"""
+    buffer = io.StringIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(ALL_RATINGS_SQL, buffer)
+    buffer.seek(0)
+    ratings = pd.read_csv(buffer, dtype={'user_id': np.int32, 'book_id': np.int32, 'rating': np.int8})
+    print(f"✅ {len(ratings)} valoraciones leídas", flush=True)
+    return ratings
+
+def build_matrices(ratings):
+    """
+    Matrices usuario x libro con los mismos índices:
+    liked (rating >= 4, float32) y rated (cualquier valoración, bool)
+    """
+    user_codes, user_ids = pd.factorize(ratings['user_id'].to_numpy(), sort=True)
+    book_codes, book_ids = pd.factorize(ratings['book_id'].to_numpy(), sort=True)
+    shape = (len(user_ids), len(book_ids))
+
+    rated = sparse.csr_matrix((np.ones(len(user_codes), dtype=bool), (user_codes, book_codes)), shape=shape)
+    positive = ratings['rating'].to_numpy() >= 4
+    liked = sparse.csr_matrix((np.ones(int(positive.sum()), dtype=np.float32),
+                               (user_codes[positive], book_codes[positive])), shape=shape)
+    # Varios ejemplares del mismo libro cuentan una vez
+    liked.data[:] = 1
+    return np.asarray(user_ids), np.asarray(book_ids), liked, rated
+
+def neighbor_matrix(book_ids, sources, targets, scores):
+    """Matriz dispersa libro x libro S[a, b] en las posiciones de book_ids"""
+    positions = {book_id: i for i, book_id in enumerate(book_ids.tolist())}
+    rows, cols, values = [], [], []
+    for source, target, score in zip(sources.tolist(), targets.tolist(), scores.tolist()):
+        if source in positions and target in positions:
+            rows.append(positions[source])
+            cols.append(positions[target])
+            values.append(score)
+    return sparse.csr_matrix((np.asarray(values, dtype=np.float32), (rows, cols)),
+                             shape=(len(book_ids), len(book_ids)))
+
+def similarity_neighbors(user_ids, book_ids, liked, top_k, n_jobs):
+    index = item_similarity_index(UserBookMatrix(liked.astype(bool), user_ids, book_ids),
+                                  top_n=top_k, n_jobs=n_jobs)
+    counts = np.diff(index.indptr)
+    return neighbor_matrix(book_ids, np.repeat(index.book_ids, counts), index.rec_ids, index.confidence)
+
+def rule_neighbors(conn, book_ids):
+    with conn.cursor() as cur:
+        cur.execute(RULES_SQL)
+        rows = np.asarray(cur.fetchall(), dtype=np.float64).reshape(-1, 3)
+    conn.commit()
+    return neighbor_matrix(book_ids, rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64), rows[:, 2])
+
+# ============================================================================
+# Puntuación por bloques de usuarios (en varios procesos)
+# ============================================================================
+
+_worker_state = None
+
+def _init_worker(liked, rated, neighbors, top_n):
+    global _worker_state
+    _worker_state = (liked, rated, neighbors, top_n)
+
+def _score_users(bounds):
+    """Top-N de los usuarios [start, stop): (fila de usuario, rank, columna de libro, puntuación)"""
+    start, stop = bounds
+    liked, rated, neighbors, top_n = _worker_state
+
+    scores = (liked[start:stop] @ neighbors).tocsr()
+    # Quito los libros que el usuario ya ha valorado
+    scores = scores - scores.multiply(rated[start:stop])
+    scores.eliminate_zeros()
+    scores.sort_indices()
+
+    users, ranks, books, values = [], [], [], []
+    for row in range(scores.shape[0]):
+        begin, end = scores.indptr[row], scores.indptr[row + 1]
+        if begin == end:
+            continue
+        data = scores.data[begin:end]
+        columns = scores.indices[begin:end]
+        n = min(top_n, len(data))
+        top = np.argpartition(-data, n - 1)[:n]
+        # Orden: puntuación descendente y, a igualdad, libro ascendente
+        top = top[np.lexsort((columns[top], -data[top]))]
+        users.append(np.full(n, start + row, dtype=np.int64))
+        ranks.append(np.arange(1, n + 1))
+        books.append(columns[top])
+        values.append(data[top])
+
+    if not users:
+        return (np.empty(0, dtype=np.int64),) * 3 + (np.empty(0, dtype=np.float32),)
+    return np.concatenate(users), np.concatenate(ranks), np.concatenate(books), np.concatenate(values)
+
+def score_all_users(liked, rated, neighbors, top_n, n_jobs, chunk_users):
+    """Recorro los bloques de usuarios en paralelo (generador, un resultado por bloque)"""
+    chunks = [(start, min(start + chunk_users, liked.shape[0]))
+              for start in range(0, liked.shape[0], chunk_users)]
+    if n_jobs is None or n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(chunks)))
+
+    initargs = (liked, rated, neighbors, top_n)
+    if n_jobs == 1:
+        _init_worker(*initargs)
+        yield from map(_score_users, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs) as pool:
+            yield from pool.map(_score_users, chunks)
+
+def train_users(conn, args, start):
+    """Entreno y publico user_recommendations (con el bloqueo de entrenamiento tomado)"""
+    ratings = load_ratings(conn)
+    conn.commit()
+    user_ids, book_ids, liked, rated = build_matrices(ratings)
+    del ratings
+
+    if args.source == 'similarity':
+        neighbors = similarity_neighbors(user_ids, book_ids, liked, args.neighbors, args.jobs)
+    else:
+        neighbors = rule_neighbors(conn, book_ids)
+    print(f"Vecinos por libro ({args.source}): {neighbors.nnz} pares", flush=True)
+
+    n_rows, n_users = 0, 0
+    with conn.cursor() as cur:
+        prepare_table(cur, 'user_recommendations')
+        for users, ranks, books, scores in score_all_users(liked, rated, neighbors, args.top_n,
+                                                           args.jobs, args.chunk_users):
+            buffer = io.StringIO()
+            pd.DataFrame({
+                'user_id': user_ids[users],
+                'rank': ranks,
+                'book_id': book_ids[books],
+                'score': scores,
+            }).to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            copy_rows(cur, 'user_recommendations', buffer)
+            n_rows += len(users)
+            n_users += int((ranks == 1).sum())
+        finish_table(cur, 'user_recommendations', USER_TABLES)
+    conn.commit()
+
+    with conn.cursor() as cur:
+        swap_tables(cur, USER_TABLES)
+        cur.execute("SELECT bump_catalog_version()")
+        version = cur.fetchone()[0]
+    conn.commit()
+
+    print(f"✅ user_recommendations publicada: {n_rows} recomendaciones de {n_users} usuarios "
+          f"en {time.perf_counter() - start:.1f} s (catálogo versión {version})", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=['similarity', 'rules'], default='similarity',
+                        help='vecinos de cada libro: similitud libro-libro o book_recommendations')
+    parser.add_argument('--neighbors', type=int, default=50, help='vecinos por libro (solo --source similarity)')
+    parser.add_argument('--top-n', type=int, default=20, help='recomendaciones guardadas por usuario')
+    parser.add_argument('--jobs', type=int, default=None, help='procesos (por defecto todos los núcleos)')
+    parser.add_argument('--chunk-users', type=int, default=2000, help='usuarios por bloque')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = connect()
+    try:
+        with training_lock(conn):
+            train_users(conn, args, start)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+Configuración común de los tests.
+
+Los tests no necesitan PostgreSQL: prueban las partes en Python puro de
+app/ (paginación, cachés, motores de minería, índices). Los módulos de la
+aplicación se importan igual que en app/app.py, con app/ en sys.path.
+"""
+import os
+import sys
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,118 @@
+"""Cachés en memoria del catálogo (cache.py): caducidad, LRU e invalidación"""
+import pytest
+
+import cache
+from cache import TTLCache, cached, invalidate_all, on_invalidate
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    return clock
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    """Cada test con su propio registro de cachés y callbacks"""
+    monkeypatch.setattr(cache, '_caches', {})
+    monkeypatch.setattr(cache, '_invalidation_callbacks', [])
+    monkeypatch.setattr(cache, '_catalog_version', 0)
+    monkeypatch.setattr(cache, '_catalog_updated_at', None)
+    monkeypatch.setattr(cache, 'CACHE_ENABLED', True)
+
+def test_entry_expires_after_ttl(clock):
+    c = TTLCache('t', ttl=10)
+    c.set('a', 1)
+    clock.now += 9.9
+    assert c.get('a') == 1
+    clock.now += 0.2
+    assert c.get('a', 'caducado') == 'caducado'
+    assert c.stats()['size'] == 0
+    assert (c.hits, c.misses) == (1, 1)
+
+def test_set_renews_ttl(clock):
+    c = TTLCache('t', ttl=10)
+    c.set('a', 1)
+    clock.now += 8
+    c.set('a', 2)
+    clock.now += 8
+    assert c.get('a') == 2
+
+def test_least_recently_used_is_evicted(clock):
+    c = TTLCache('t', maxsize=2)
+    c.set('a', 1)
+    c.set('b', 2)
+    c.get('a')
+    c.set('c', 3)
+    assert c.get('b') is None
+    assert c.get('a') == 1 and c.get('c') == 3
+    assert c.evictions == 1
+
+def test_cached_reuses_result_per_arguments():
+    calls = []
+
+    @cached('libros')
+    def book(book_id, full=False):
+        calls.append((book_id, full))
+        return {'id': book_id}
+
+    assert book(1) is book(1)
+    book(1, full=True)
+    book(2)
+    assert calls == [(1, False), (1, True), (2, False)]
+    assert book.cache.stats()['size'] == 3
+
+def test_cached_does_not_store_errors():
+    calls = []
+
+    @cached('falla')
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('sin conexión')
+        return 'ok'
+
+    with pytest.raises(RuntimeError):
+        flaky()
+    assert flaky() == 'ok'
+    assert flaky() == 'ok'
+    assert len(calls) == 2
+
+def test_cached_disabled(monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_ENABLED', False)
+    calls = []
+
+    @cached('sin_cache')
+    def book(book_id):
+        calls.append(book_id)
+        return book_id
+
+    book(1)
+    book(1)
+    assert calls == [1, 1]
+
+def test_invalidate_all_clears_every_cache_and_calls_callbacks():
+    a = cache.get_cache('a')
+    b = cache.get_cache('b')
+    a.set(1, 'x')
+    b.set(2, 'y')
+    called = []
+    on_invalidate(lambda: called.append('primero'))
+    on_invalidate(lambda: 1 / 0)  # un callback que falla no impide los demás
+    on_invalidate(lambda: called.append('tercero'))
+
+    invalidate_all(version=7)
+
+    assert a.get(1) is None and b.get(2) is None
+    assert called == ['primero', 'tercero']
+    assert cache.catalog_version() == 7
+
+def test_get_cache_returns_the_same_cache():
+    assert cache.get_cache('libros') is cache.get_cache('libros')
+    assert [s['name'] for s in cache.cache_stats()] == ['libros']
@@ -0,0 +1,143 @@
+"""Tokens de la paginación por clave (encode_cursor / decode_cursor en models.py)"""
+import base64
+import json
+from datetime import date
+
+import pytest
+
+import models
+from models import LAST_PAGE_CURSOR, decode_cursor, encode_cursor
+
+@pytest.mark.parametrize('values', [
+    [4.25, 1200, 42],
+    ['cien años de soledad', 7],
+    ['Ñandú & "comillas" / barra?', None],
+    [0, -1, 1e-9],
+    [],
+])
+def test_round_trip(values):
+    assert decode_cursor(encode_cursor(values)) == values
+
+def test_accepts_tuples():
+    assert decode_cursor(encode_cursor((3.5, 10))) == [3.5, 10]
+
+def test_token_is_url_safe_without_padding():
+    # Longitudes distintas para que base64 necesitara relleno
+    for values in (['a'], ['ab'], ['abc'], ['é' * 17, 99]):
+        token = encode_cursor(values)
+        assert '=' not in token
+        assert set(token) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+
+def test_non_json_values_are_sent_as_text():
+    assert decode_cursor(encode_cursor([date(2024, 2, 29), 5])) == ['2024-02-29', 5]
+
+def test_last_page_cursor():
+    assert LAST_PAGE_CURSOR
+    assert decode_cursor(LAST_PAGE_CURSOR) == []
+
+@pytest.mark.parametrize('token', [None, '', '!!!', 'no-es-base64', '%%%'])
+def test_invalid_token_is_first_page(token):
+    assert decode_cursor(token) is None
+
+def test_token_that_is_not_a_list_is_first_page():
+    token = base64.urlsafe_b64encode(json.dumps({'rating': 4}).encode()).decode().rstrip('=')
+    assert decode_cursor(token) is None
+
+# ============================================================================
+# Validación de la clave en _keyset_page
+# ============================================================================
+
+KEY_TYPES = ['numeric', 'bigint', 'integer']
+
+@pytest.mark.parametrize('values', [
+    [4.25, 1200, 42],
+    ['4.25', 1200, 42],  # los Decimal viajan como texto
+    [4, 0, -1],
+])
+def test_valid_key(values):
+    assert models._valid_cursor_key(values, KEY_TYPES)
+
+@pytest.mark.parametrize('values', [
+    None,
+    [4.25, 1200],
+    [4.25, 1200, 42, 1],
+    ['abc', 1, 2],
+    [4.25, '1200', 42],
+    [4.25, 1200, 4.5],
+    [True, 1200, 42],
+    [None, 1200, 42],
+    ['NaN', 1200, 42],
+    [4.25, 2 ** 63, 42],
+    [4.25, 1200, 2 ** 31],
+])
+def test_invalid_key(values):
+    assert not models._valid_cursor_key(values, KEY_TYPES)
+
+def test_empty_key_only_for_last_page():
+    assert models._valid_cursor_key([], KEY_TYPES, allow_empty=True)
+    assert not models._valid_cursor_key([], KEY_TYPES)
+
+def test_text_and_timestamp_keys():
+    assert models._valid_cursor_key(['2024-02-29 10:00:00+00:00', 'Rayuela'], ['timestamptz', 'text'])
+    assert not models._valid_cursor_key(['ayer', 'Rayuela'], ['timestamptz', 'text'])
+    assert not models._valid_cursor_key(['2024-02-29', 7], ['timestamp', 'text'])
+
+class Row:
+    def __init__(self, book_id):
+        self._mapping = {'book_id': book_id}
+
+@pytest.fixture
+def read_calls(monkeypatch):
+    """Sustituyo _read: guardo la consulta y devuelvo 21 filas (hay página siguiente)"""
+    calls = []
+
+    class Result:
+        def fetchall(self):
+            return [Row(book_id) for book_id in range(1, 22)]
+
+    def fake_read(query, params=None):
+        calls.append((query, params))
+        return Result()
+
+    monkeypatch.setattr(models, '_read', fake_read)
+    return calls
+
+def keyset_page(**kwargs):
+    return models._keyset_page('SELECT book_id FROM books', {}, ['book_id'], ['integer'],
+                               descending=False, per_page=20, **kwargs)
+
+@pytest.mark.parametrize('kwargs', [
+    {'after': encode_cursor(['abc'])},
+    {'after': encode_cursor([1, 2])},
+    {'after': encode_cursor([])},
+    {'before': encode_cursor(['abc'])},
+    {'before': encode_cursor([1, 2])},
+    {'after': 'no-es-un-token', 'page': 5},
+    {'before': encode_cursor([1.5]), 'page': 3},
+])
+def test_invalid_token_is_served_as_first_page(read_calls, kwargs):
+    rows, pagination = keyset_page(**kwargs)
+    query, params = read_calls[0]
+    assert 'WHERE' not in query
+    assert 'ASC' in query
+    assert params['offset'] == 0
+    assert [row._mapping['book_id'] for row in rows] == list(range(1, 21))
+    assert pagination['page'] == 1
+    assert not pagination['has_prev']
+    assert pagination['has_next']
+
+def test_valid_tokens(read_calls):
+    _, pagination = keyset_page(after=encode_cursor([40]))
+    query, params = read_calls[-1]
+    assert 'WHERE (book_id) > (CAST(:k0 AS integer))' in query
+    assert params['k0'] == 40 and pagination['has_prev']
+
+    keyset_page(before=encode_cursor([40]))
+    query, params = read_calls[-1]
+    assert 'WHERE (book_id) < (CAST(:k0 AS integer))' in query and 'DESC' in query
+
+    # Última página: se recorre desde el final sin clave
+    _, pagination = keyset_page(before=LAST_PAGE_CURSOR)
+    query, _ = read_calls[-1]
+    assert 'WHERE' not in query and 'DESC' in query
+    assert not pagination['has_next'] and pagination['has_prev']
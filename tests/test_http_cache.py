@@ -0,0 +1,94 @@
+"""Caché de páginas renderizadas y GET condicional (http_cache.py)"""
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask, g, request
+
+import cache
+import http_cache
+from http_cache import cached_page
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Veces que se ha ejecutado cada vista"""
+    monkeypatch.setattr(http_cache, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(cache, '_catalog_version', 3)
+    monkeypatch.setattr(cache, '_catalog_updated_at', datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc))
+    http_cache._pages.clear()
+    return []
+
+@pytest.fixture
+def client(renders):
+    app = Flask(__name__)
+
+    @app.route('/')
+    @cached_page(unless=lambda: bool(request.args.get('q')))
+    def listing():
+        renders.append(request.full_path)
+        return f"<p>página {request.args.get('page', 1)}</p>"
+
+    @app.route('/failed')
+    @cached_page()
+    def failed():
+        renders.append(request.full_path)
+        g.query_failed = True
+        return '<p>sin resultados</p>'
+
+    @app.route('/missing')
+    @cached_page()
+    def missing():
+        renders.append(request.full_path)
+        return 'no existe', 404
+
+    return app.test_client()
+
+def test_second_request_is_served_from_cache(client, renders):
+    first = client.get('/?page=2')
+    second = client.get('/?page=2')
+    assert first.status_code == second.status_code == 200
+    assert second.get_data(as_text=True) == '<p>página 2</p>'
+    assert len(renders) == 1
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['ETag'].startswith('"3-')
+    assert first.headers['Last-Modified'] == 'Wed, 01 May 2024 12:00:00 GMT'
+    assert 'public' in first.headers['Cache-Control']
+    assert f'max-age={http_cache.PAGE_MAX_AGE}' in first.headers['Cache-Control']
+
+    client.get('/?page=3')
+    assert len(renders) == 2
+
+def test_matching_if_none_match_is_304(client, renders):
+    etag = client.get('/').headers['ETag']
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert client.get('/', headers={'If-None-Match': '"3-otro"'}).status_code == 200
+    assert len(renders) == 1
+
+def test_catalog_version_bump_misses_the_cache(client, renders, monkeypatch):
+    etag = client.get('/').headers['ETag']
+    monkeypatch.setattr(cache, '_catalog_version', 4)
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('"4-')
+    assert len(renders) == 2
+
+def test_unless_skips_the_cache(client, renders):
+    response = client.get('/?q=borges')
+    client.get('/?q=borges')
+    assert len(renders) == 2
+    assert 'ETag' not in response.headers
+
+def test_failed_query_is_not_cached_nor_validated(client, renders):
+    response = client.get('/failed')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in response.headers
+    client.get('/failed')
+    assert len(renders) == 2
+    assert http_cache._pages.stats()['size'] == 0
+
+def test_error_status_is_not_cached(client, renders):
+    assert client.get('/missing').status_code == 404
+    assert client.get('/missing').status_code == 404
+    assert len(renders) == 2
@@ -0,0 +1,64 @@
+"""Vecinos libro-libro por bloques (item_similarity.py) frente al cálculo denso"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from item_similarity import item_similarity_index
+from recommendation import create_user_book_matrix
+
+TOP_N = 4
+
+@pytest.fixture(scope='module')
+def matrix():
+    """120 usuarios y 30 libros (ids no consecutivos) con popularidad desigual"""
+    rng = np.random.default_rng(11)
+    liked = rng.random((120, 30)) < np.linspace(0.5, 0.03, 30)
+    users, books = np.nonzero(liked)
+    ratings = pd.DataFrame({'user_id': users + 1, 'book_id': books * 5 + 10, 'rating': 5})
+    return create_user_book_matrix(ratings)
+
+def brute_force(matrix, metric, min_common):
+    """Similitud y usuarios en común de todos los pares con la matriz densa XᵀX"""
+    x = matrix.csr.toarray().astype(np.float64)
+    common = x.T @ x
+    counts = np.diag(common)
+    if metric == 'cosine':
+        denominator = np.sqrt(np.outer(counts, counts))
+    else:
+        denominator = counts[:, None] + counts[None, :] - common
+    similarity = np.divide(common, denominator, out=np.zeros_like(common), where=denominator > 0)
+    np.fill_diagonal(similarity, 0)
+    similarity[common < min_common] = 0
+    return similarity, common
+
+@pytest.mark.parametrize('metric', ['cosine', 'jaccard'])
+@pytest.mark.parametrize('n_jobs', [1, 2])
+@pytest.mark.parametrize('min_common', [1, 3])
+def test_top_k_matches_brute_force(matrix, metric, n_jobs, min_common):
+    # block_size pequeño para que haya varios bloques y uno incompleto al final
+    index = item_similarity_index(matrix, top_n=TOP_N, metric=metric, block_size=7,
+                                  n_jobs=n_jobs, min_common=min_common)
+    similarity, common = brute_force(matrix, metric, min_common)
+
+    for col, book_id in enumerate(matrix.book_ids.tolist()):
+        found = index.recommend(book_id, top_n=TOP_N + 1)
+        expected = np.sort(similarity[col][similarity[col] > 0])[::-1][:TOP_N]
+        # Mismas similitudes (los empates pueden elegir vecinos distintos)
+        assert [sim for _, sim, _ in found] == pytest.approx(expected.tolist(), rel=1e-5)
+        for rec_id, sim, users in found:
+            other = matrix.book_index[rec_id]
+            assert rec_id != book_id
+            assert sim == pytest.approx(similarity[col, other], rel=1e-5)
+            assert users == common[col, other] >= min_common
+
+def test_books_without_neighbors_are_left_out(matrix):
+    index = item_similarity_index(matrix, top_n=TOP_N, n_jobs=1, min_common=1000)
+    assert len(index) == 0
+    assert index.recommend(matrix.book_ids[0].item()) == []
+
+def test_titles_and_unknown_metric(matrix):
+    books = pd.DataFrame({'id': matrix.book_ids, 'title': [f'Libro {i}' for i in matrix.book_ids]})
+    index = item_similarity_index(matrix, books, top_n=TOP_N, n_jobs=1)
+    assert len(index.recommend_title('libro 10')) == 3
+    with pytest.raises(ValueError):
+        item_similarity_index(matrix, metric='euclidean')
@@ -0,0 +1,128 @@
+"""Formato de texto de Prometheus y atribución de consultas (metrics.py)"""
+import re
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import metrics
+from metrics import Counter, Histogram, TimedQueuePool
+
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+LABEL = re.compile(r'(?P<name>[a-zA-Z_]\w*)="(?P<value>(?:[^"\\]|\\.)*)"')
+
+def parse(text):
+    """Líneas de muestra -> [(nombre, {etiqueta: valor sin escapar}, valor)]; compruebo HELP y TYPE"""
+    lines = text.split('\n')
+    assert lines[0].startswith('# HELP ') and lines[1].startswith('# TYPE ')
+    samples = []
+    for line in lines[2:]:
+        match = SAMPLE.match(line)
+        assert match, line
+        labels = {}
+        if match['labels']:
+            pairs = LABEL.findall(match['labels'])
+            assert ','.join(f'{n}="{v}"' for n, v in pairs) == match['labels']
+            labels = {n: re.sub(r'\\(.)', lambda m: '\n' if m[1] == 'n' else m[1], v) for n, v in pairs}
+        samples.append((match['name'], labels, float(match['value'])))
+    return samples
+
+def test_counter():
+    counter = Counter('test_total', 'Prueba', ('function',))
+    counter.inc('get_books')
+    counter.inc('get_books', amount=2)
+    counter.inc('search')
+    assert parse(counter.render()) == [
+        ('test_total', {'function': 'get_books'}, 3),
+        ('test_total', {'function': 'search'}, 1),
+    ]
+    assert counter.total() == 4
+
+def test_counter_without_labels():
+    counter = Counter('test_timeouts_total', 'Prueba')
+    counter.inc()
+    assert counter.render().split('\n')[1:] == ['# TYPE test_timeouts_total counter', 'test_timeouts_total 1']
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', 'Prueba', ('endpoint',), buckets=(0.1, 1, 5))
+    for value in (0.05, 0.1, 0.5, 2, 7, 30):
+        histogram.observe(value, 'home')
+    samples = parse(histogram.render())
+
+    buckets = [(labels['le'], value) for name, labels, value in samples if name == 'test_seconds_bucket']
+    assert buckets == [('0.1', 2), ('1.0', 3), ('5.0', 4), ('+Inf', 6)]
+    values = {name: value for name, _, value in samples if not name.endswith('_bucket')}
+    assert values['test_seconds_count'] == 6
+    assert values['test_seconds_sum'] == pytest.approx(39.65)
+    # El bucket +Inf es siempre el total
+    assert buckets[-1][1] == values['test_seconds_count']
+    assert all(labels['endpoint'] == 'home' for _, labels, _ in samples)
+
+def test_label_values_are_escaped():
+    counter = Counter('test_total', 'Prueba', ('endpoint',))
+    raw = 'a"b\\c\nd'
+    counter.inc(raw)
+    line = counter.render().split('\n')[2]
+    assert line == 'test_total{endpoint="a\\"b\\\\c\\nd"} 1'
+    assert parse(counter.render())[0][1] == {'endpoint': raw}
+
+# ============================================================================
+# _query_origin: la consulta se atribuye a la función pública de models.py
+# ============================================================================
+
+def _fake_execute():
+    """Hace de SQLAlchemy: _query_origin se llama desde el evento, dos marcos por debajo"""
+    return _fake_event()
+
+def _fake_event():
+    return metrics._query_origin()
+
+MODELS_SOURCE = '''
+def _read():
+    return execute()
+
+def _get_books(ids):
+    return _read()
+
+def get_books(ids):
+    return _get_books(ids)
+
+def _warm_up():
+    return _read()
+'''
+
+@pytest.fixture
+def fake_models():
+    namespace = {'__name__': metrics.MODELS_MODULE, 'execute': _fake_execute}
+    exec(compile(MODELS_SOURCE, 'models.py', 'exec'), namespace)
+    return namespace
+
+def test_query_is_attributed_to_the_public_function(fake_models):
+    function, site = fake_models['get_books']([1])
+    assert function == 'get_books'
+    # El sitio es la función más interna que no es _read, con su línea
+    assert site == '_get_books:6'
+
+def test_private_only_chain_uses_the_outermost_name(fake_models):
+    assert fake_models['_warm_up']() == ('warm_up', '_warm_up:12')
+
+def test_query_outside_models():
+    assert _fake_execute() == ('other', 'other')
+
+# ============================================================================
+# TimedQueuePool
+# ============================================================================
+
+def test_timed_pool_measures_waits_and_timeouts():
+    engine = create_engine('sqlite://', poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    waits = sum(series[2] for series in metrics.db_pool_wait._series.values())
+    timeouts = metrics.db_pool_timeouts.total()
+
+    conn = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    conn.close()
+    engine.dispose()
+
+    assert sum(series[2] for series in metrics.db_pool_wait._series.values()) == waits + 2
+    assert metrics.db_pool_timeouts.total() == timeouts + 1
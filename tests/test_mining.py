@@ -0,0 +1,81 @@
+"""Los motores de mining.py encuentran lo mismo que mlxtend.apriori"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from mining import iter_pair_counts, mine_frequent_itemsets
+from recommendation import create_user_book_matrix
+
+@pytest.fixture(scope='module')
+def matrix():
+    """
+    Valoraciones sintéticas: 300 usuarios y 40 libros (ids no consecutivos)
+    con popularidad desigual, grupos de libros que se valoran juntos,
+    valoraciones negativas y alguna repetida
+    """
+    rng = np.random.default_rng(7)
+    n_users, n_books = 300, 40
+    book_ids = np.arange(n_books) * 3 + 100
+    popularity = np.linspace(0.45, 0.02, n_books)
+    liked = rng.random((n_users, n_books)) < popularity
+    # Dos grupos de libros que suelen gustar a la vez
+    for group in (slice(5, 9), slice(20, 23)):
+        fans = rng.random(n_users) < 0.2
+        liked[fans, group] |= rng.random((fans.sum(), liked[:, group].shape[1])) < 0.9
+
+    users, books = np.nonzero(liked)
+    ratings = pd.DataFrame({'user_id': users + 1, 'book_id': book_ids[books],
+                            'rating': rng.integers(4, 6, len(users))})
+    noise = pd.DataFrame({'user_id': rng.integers(1, n_users + 1, 500),
+                          'book_id': rng.choice(book_ids, 500),
+                          'rating': rng.integers(1, 4, 500)})
+    ratings = pd.concat([ratings, noise, ratings.head(50)], ignore_index=True)
+    return create_user_book_matrix(ratings)
+
+def as_dict(itemsets):
+    return dict(zip(itemsets['itemsets'], itemsets['support']))
+
+def assert_same_itemsets(found, expected):
+    found, expected = as_dict(found), as_dict(expected)
+    assert set(found) == set(expected)
+    for itemset, support in expected.items():
+        assert found[itemset] == pytest.approx(support)
+
+@pytest.mark.parametrize('min_support', [0.2, 0.1, 0.05])
+@pytest.mark.parametrize('n_jobs', [1, 3])
+def test_fpgrowth_matches_apriori(matrix, min_support, n_jobs):
+    expected = mine_frequent_itemsets(matrix, min_support=min_support, engine='apriori')
+    found = mine_frequent_itemsets(matrix, min_support=min_support, engine='fpgrowth', n_jobs=n_jobs)
+    assert expected['itemsets'].map(len).max() >= 3
+    assert_same_itemsets(found, expected)
+
+@pytest.mark.parametrize('min_support', [0.1, 0.05, 0.01])
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_pairs_matches_apriori(matrix, min_support, n_jobs):
+    expected = mine_frequent_itemsets(matrix, min_support=min_support, max_len=2, engine='apriori')
+    found = mine_frequent_itemsets(matrix, min_support=min_support, engine='pairs', n_jobs=n_jobs)
+    assert_same_itemsets(found, expected)
+
+def test_single_books(matrix):
+    expected = mine_frequent_itemsets(matrix, min_support=0.1, max_len=1, engine='apriori')
+    for engine in ('pairs', 'fpgrowth'):
+        assert_same_itemsets(mine_frequent_itemsets(matrix, min_support=0.1, max_len=1, engine=engine), expected)
+
+def test_iter_pair_counts_matches_dense_product(matrix):
+    dense = matrix.csr.toarray().astype(np.int64)
+    co = dense.T @ dense
+    rows, cols = np.triu_indices_from(co, k=1)
+    expected = {(a, b): c for a, b, c in zip(rows.tolist(), cols.tolist(), co[rows, cols].tolist()) if c >= 3}
+
+    found = {}
+    for block_rows, block_cols, counts in iter_pair_counts(matrix, min_count=3, n_jobs=1, block_size=7):
+        for a, b, c in zip(block_rows.tolist(), block_cols.tolist(), counts.tolist()):
+            assert (a, b) not in found
+            found[(a, b)] = c
+    assert found == expected
+
+def test_unknown_engine_and_long_pairs(matrix):
+    with pytest.raises(ValueError):
+        mine_frequent_itemsets(matrix, engine='eclat')
+    with pytest.raises(ValueError):
+        mine_frequent_itemsets(matrix, max_len=3, engine='pairs')
@@ -0,0 +1,109 @@
+"""Índice compilado de reglas (rule_index.py)"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_service
+from rule_index import RuleIndex, normalize_title
+
+@pytest.fixture
+def rules():
+    """Reglas como las de generate_rules, con pares repetidos y reglas de varios libros"""
+    return pd.DataFrame({
+        'antecedents': [frozenset([1]), frozenset([1]), frozenset([1, 2]), frozenset([2]), frozenset([3]), frozenset([1])],
+        'consequents': [frozenset([2]), frozenset([3]), frozenset([4]), frozenset([1]), frozenset([1, 3]), frozenset([2])],
+        'confidence': [0.7, 0.9, 0.8, 0.6, 0.75, 0.65],
+        'lift': [1.5, 2.0, 3.0, 1.2, 1.1, 4.0],
+    })
+
+@pytest.fixture
+def books():
+    return pd.DataFrame({'id': [1, 2, 3, 4], 'title': ['Rayuela', 'Ficciones', 'Pedro  Páramo', 'Aura']})
+
+def test_from_rules_orders_and_deduplicates(rules, books):
+    index = RuleIndex.from_rules(rules, books)
+    # 1 -> 2 sale dos veces: me quedo con la de mayor confianza (0.7, no 0.65)
+    assert index.recommend(1, top_n=10) == [(3, 0.9, 2.0), (4, 0.8, 3.0), (2, 0.7, 1.5)]
+    assert index.recommend(2, top_n=10) == [(4, 0.8, 3.0), (1, 0.6, 1.2)]
+    # {3} -> {1, 3}: un libro no se recomienda a sí mismo
+    assert index.recommend(3, top_n=10) == [(1, 0.75, 1.1)]
+    assert index.recommend(4) == []
+    assert len(index) == 3
+
+def test_top_n(rules):
+    assert [rec for rec, _, _ in RuleIndex.from_rules(rules).recommend(1, top_n=2)] == [3, 4]
+    assert len(RuleIndex.from_rules(rules, top_n=1).recommend(1, top_n=10)) == 1
+
+def test_recommend_title(rules, books):
+    index = RuleIndex.from_rules(rules, books)
+    assert index.recommend_title('  RAYUELA ', top_n=2) == [('Pedro  Páramo', 0.9), ('Aura', 0.8)]
+    assert index.book_id_for_title('pedro páramo') == 3
+    assert index.recommend_title('No existe') == []
+    assert normalize_title(' Pedro\t Páramo ') == 'pedro páramo'
+
+def test_recommend_many(rules):
+    index = RuleIndex.from_rules(rules)
+    assert index.recommend_many([1, 99], top_n=1) == {1: [(3, 0.9, 2.0)], 99: []}
+
+def test_empty_rules():
+    index = RuleIndex.from_rules(pd.DataFrame())
+    assert len(index) == 0
+    assert index.recommend(1) == []
+
+# ============================================================================
+# save / load y publicación de versiones (model_service.py)
+# ============================================================================
+
+def test_save_load_round_trip(rules, tmp_path):
+    index = RuleIndex.from_rules(rules)
+    index.save(tmp_path / 'v1', version='v1', min_support=0.05)
+
+    loaded = RuleIndex.load(tmp_path / 'v1')
+    assert loaded.meta['version'] == 'v1'
+    assert loaded.meta['min_support'] == 0.05
+    assert (loaded.meta['books'], loaded.meta['recommendations']) == (len(index), len(index.rec_ids))
+    # Los arrays siguen mapeados: load() no los copia
+    for name in ('book_ids', 'indptr', 'rec_ids', 'confidence', 'lift'):
+        assert not getattr(loaded, name).flags.owndata
+    assert loaded.nbytes == index.nbytes
+    for book_id in (1, 2, 3, 4):
+        assert loaded.recommend(book_id, top_n=10) == index.recommend(book_id, top_n=10)
+
+def test_save_load_empty_index(tmp_path):
+    RuleIndex.from_rules(pd.DataFrame()).save(tmp_path)
+    loaded = RuleIndex.load(tmp_path)
+    assert len(loaded) == 0
+    assert loaded.recommend(1) == []
+
+def test_load_rejects_incomplete_or_wrong_arrays(rules, tmp_path):
+    index = RuleIndex.from_rules(rules)
+    index.save(tmp_path)
+
+    # Sin meta.json (se escribe el último) la carpeta está a medias
+    (tmp_path / 'meta.json').rename(tmp_path / 'meta.json.bak')
+    with pytest.raises(FileNotFoundError):
+        RuleIndex.load(tmp_path)
+    (tmp_path / 'meta.json.bak').rename(tmp_path / 'meta.json')
+
+    np.save(tmp_path / 'confidence.npy', index.confidence.astype(np.float32))
+    with pytest.raises(ValueError, match='confidence'):
+        RuleIndex.load(tmp_path)
+
+def test_publish_switches_current_and_prunes_old_versions(rules, tmp_path):
+    index = RuleIndex.from_rules(rules)
+    versions = [model_service.publish(index, tmp_path, catalog_version) for catalog_version in (1, 2, 3, 4)]
+
+    assert model_service.current_version(tmp_path) == versions[-1]
+    assert versions[-1].startswith('000004-')
+    kept = sorted(p.name for p in tmp_path.iterdir() if p.is_dir())
+    assert kept == versions[-1 - model_service.KEEP_VERSIONS:]
+    assert not (tmp_path / 'CURRENT.tmp').exists()
+
+    model = model_service.load(versions[-1], tmp_path)
+    assert model.version == versions[-1]
+    assert model.index.meta['catalog_version'] == 4
+    assert model.index.recommend(1) == index.recommend(1)
+    assert model.stats()['books'] == len(index)
+
+def test_current_version_without_models(tmp_path):
+    assert model_service.current_version(tmp_path) is None
@@ -0,0 +1,60 @@
+"""Índice de prefijos del autocompletado (suggest.py)"""
+import pytest
+
+from suggest import SHORT_PREFIX_LENGTH, SuggestIndex, normalize
+
+# (book_id, título, autores, valoraciones)
+ROWS = [
+    (1, 'Cien años de soledad', 'Gabriel García Márquez', 500),
+    (2, 'El amor en los tiempos del cólera', 'Gabriel García Márquez', 300),
+    (3, 'La casa de los espíritus', 'Isabel Allende', 300),
+    (4, 'Harry Potter and the Sorcerer\'s Stone', 'J.K. Rowling, Mary GrandPré', 900),
+    (5, 'Rayuela', 'Julio Cortázar', None),
+    (6, None, None, 10),
+]
+
+@pytest.fixture(scope='module')
+def index():
+    return SuggestIndex(ROWS)
+
+def ids(results):
+    return [book['id'] for book in results]
+
+def test_normalize():
+    assert normalize('  Cortázar, JULIO! ') == 'cortazar julio'
+    assert normalize("Sorcerer's_Stone") == 'sorcerer s stone'
+    assert normalize(None) == ''
+
+def test_prefix_of_any_word_of_title_or_author(index):
+    assert ids(index.suggest('soled')) == [1]
+    assert ids(index.suggest('garcia marq')) == [1, 2]
+    assert ids(index.suggest('grandpre')) == [4]
+    assert ids(index.suggest('espiritus')) == [3]
+    # Sin acentos ni mayúsculas
+    assert ids(index.suggest('CORTÁZAR')) == [5]
+
+def test_words_must_be_consecutive(index):
+    assert ids(index.suggest('amor en')) == [2]
+    assert index.suggest('amor colera') == []
+
+def test_ordered_by_popularity_then_book_id(index):
+    assert ids(index.suggest('g')) == [4, 1, 2]
+    # 2 y 3 tienen las mismas valoraciones: primero el book_id más bajo
+    assert ids(index.suggest('los')) == [2, 3]
+    assert ids(index.suggest('de')) == [1, 2, 3, 6]
+
+def test_short_prefixes_match_the_full_search(index):
+    prefixes = {key[:n] for key in index.keys for n in range(1, SHORT_PREFIX_LENGTH + 1)}
+    for prefix in prefixes:
+        assert index.short[prefix].tolist() == index._match(prefix).tolist()
+
+def test_limit_and_empty_query(index):
+    assert len(index.suggest('g', limit=2)) == 2
+    assert index.suggest('') == []
+    assert index.suggest(' ,. ') == []
+    assert index.suggest('zzz') == []
+
+def test_result_fields_and_defaults(index):
+    assert index.suggest('rayuela') == [{'id': 5, 'title': 'Rayuela', 'author': 'Julio Cortázar', 'num_ratings': 0}]
+    assert index.suggest('sin titulo') == [{'id': 6, 'title': 'Sin título', 'author': 'Desconocido', 'num_ratings': 10}]
+    assert len(index) == len(ROWS)